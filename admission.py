@@ -0,0 +1,205 @@
+# admission.py
+"""
+Load reporting and admission control for the agent worker.
+
+The worker's load is the highest of three signals, each scaled so that
+LOAD_THRESHOLD means "full":
+  - active sessions against WORKER_MAX_SESSIONS,
+  - CPU utilisation (cgroup-aware, averaged over a few seconds),
+  - event-loop lag of the job loops against WORKER_MAX_LOOP_LAG_MS.
+LiveKit stops offering jobs to a worker whose load reaches the threshold, and
+request_fnc rejects (without terminating the job, so the dispatcher tries
+another worker) when a fresh check says the worker is full.
+
+Sessions may run in other processes, so each job loop writes its lag to a
+small file in a directory shared through the environment; load_fnc reads them.
+load_fnc and request_fnc run in the worker's main process, which also serves
+/metrics (metrics.start_server), so the admission counters and worker_* gauges
+are exported from there.
+"""
+
+import asyncio
+import atexit
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import metrics
+
+log = logging.getLogger("admission")
+
+MAX_SESSIONS = int(os.getenv("WORKER_MAX_SESSIONS", "8"))
+MAX_LOOP_LAG = float(os.getenv("WORKER_MAX_LOOP_LAG_MS", "150")) / 1000
+LOAD_THRESHOLD = float(os.getenv("WORKER_LOAD_THRESHOLD", "0.8"))
+LAG_INTERVAL = 0.5
+# lag reports older than this belong to a job that has gone away
+STALE_SECS = 5.0
+
+_LAG_DIR_ENV = "SALES_AGENT_LAG_DIR"
+
+
+def lag_dir() -> Path:
+    """Directory job loops report lag into; created by the first caller and inherited by job processes."""
+    path = os.environ.get(_LAG_DIR_ENV)
+    if not path:
+        path = os.environ[_LAG_DIR_ENV] = tempfile.mkdtemp(prefix="sales-agent-lag-")
+        atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return Path(path)
+
+
+class LoopLagMonitor:
+    """Measures how late asyncio wakes a sleeping task on one event loop."""
+
+    def __init__(self, name: str, interval: float = LAG_INTERVAL):
+        self._interval = interval
+        self._path = lag_dir() / f"{os.getpid()}-{name}.lag"
+        self.lag = 0.0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        hist = metrics.registry.histogram("loop_lag")
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self._interval)
+            lag = max(0.0, loop.time() - started - self._interval)
+            # decay slowly so one stall stays visible for a few reports
+            self.lag = max(lag, self.lag * 0.5)
+            hist.observe(lag)
+            try:
+                self._path.write_text(f"{self.lag:.4f}")
+            except OSError:
+                pass
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._path.unlink(missing_ok=True)
+
+
+def loop_lag() -> float:
+    """Worst recent lag reported by any job loop of this worker."""
+    worst, now = 0.0, time.time()
+    try:
+        entries = list(lag_dir().glob("*.lag"))
+    except OSError:
+        return 0.0
+    for entry in entries:
+        try:
+            if now - entry.stat().st_mtime > STALE_SECS:
+                entry.unlink(missing_ok=True)
+                continue
+            worst = max(worst, float(entry.read_text() or 0))
+        except (OSError, ValueError):
+            continue
+    return worst
+
+
+class _CpuSampler:
+    """Background moving average of CPU use, like livekit's default load function."""
+
+    def __init__(self, window: int = 6, interval: float = 0.5):
+        from livekit.agents.utils.hw import get_cpu_monitor
+
+        self._monitor = get_cpu_monitor()
+        self._interval = interval
+        self._samples: list[float] = []
+        self._window = window
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, daemon=True, name="admission_cpu").start()
+
+    def _run(self) -> None:
+        while True:
+            value = self._monitor.cpu_percent(interval=self._interval)
+            with self._lock:
+                self._samples = (self._samples + [value])[-self._window:]
+
+    def value(self) -> float:
+        with self._lock:
+            return sum(self._samples) / len(self._samples) if self._samples else 0.0
+
+
+_cpu: _CpuSampler | None = None
+_cpu_lock = threading.Lock()
+
+
+def cpu_load() -> float:
+    global _cpu
+    if _cpu is None:
+        with _cpu_lock:
+            if _cpu is None:
+                _cpu = _CpuSampler()
+    return _cpu.value()
+
+
+def compute_load(sessions: int, cpu: float, lag: float) -> float:
+    """Combine the three signals; LOAD_THRESHOLD is reached when any one is at its limit."""
+    parts = [cpu]
+    if MAX_SESSIONS > 0:
+        parts.append(LOAD_THRESHOLD * sessions / MAX_SESSIONS)
+    if MAX_LOOP_LAG > 0:
+        parts.append(LOAD_THRESHOLD * lag / MAX_LOOP_LAG)
+    return min(1.0, max(parts))
+
+
+_last = {"sessions": 0, "cpu": 0.0, "lag": 0.0, "load": 0.0}
+
+
+def _register_gauges() -> None:
+    # only where load_fnc runs; job processes would export zeros for the worker
+    metrics.registry.gauge("worker_load", lambda: _last["load"])
+    metrics.registry.gauge("worker_sessions", lambda: _last["sessions"])
+    metrics.registry.gauge("worker_cpu", lambda: _last["cpu"])
+    metrics.registry.gauge("worker_loop_lag_seconds", lambda: _last["lag"])
+
+
+def load_fnc(worker) -> float:
+    """WorkerOptions.load_fnc; runs in an executor thread of the worker's main process."""
+    if "worker_load" not in metrics.registry.gauges:
+        _register_gauges()
+    sessions = len(worker.active_jobs)
+    cpu, lag = cpu_load(), loop_lag()
+    load = compute_load(sessions, cpu, lag)
+    _last.update(sessions=sessions, cpu=cpu, lag=lag, load=load)
+    return load
+
+
+def full_reason(sessions: int, cpu: float, lag: float) -> str | None:
+    if MAX_SESSIONS > 0 and sessions >= MAX_SESSIONS:
+        return f"{sessions} sessions (max {MAX_SESSIONS})"
+    if cpu >= LOAD_THRESHOLD:
+        return f"CPU at {cpu:.0%}"
+    if MAX_LOOP_LAG > 0 and lag >= MAX_LOOP_LAG:
+        return f"event loop lag {lag * 1000:.0f} ms"
+    return None
+
+
+async def request_fnc(req) -> None:
+    """WorkerOptions.request_fnc; the worker refreshes load_fnc just before calling it."""
+    reason = full_reason(_last["sessions"], _last["cpu"], _last["lag"])
+    if reason is not None:
+        metrics.registry.inc("jobs_rejected")
+        log.warning("🚦 Rejecting job %s: %s", req.id, reason)
+        # terminate=False lets the dispatcher offer the call to another worker
+        await req.reject(terminate=False)
+        return
+    metrics.registry.inc("jobs_accepted")
+    await req.accept()
+
+
+def track_session(ctx) -> LoopLagMonitor:
+    """Call at the top of the job entrypoint: reports this loop's lag until the job shuts down."""
+    monitor = LoopLagMonitor(ctx.job.id)
+    monitor.start()
+    ctx.add_shutdown_callback(monitor.aclose)
+    return monitor
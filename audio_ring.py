@@ -0,0 +1,106 @@
+# audio_ring.py
+"""
+Preallocated per-session audio buffers.
+
+AudioRing holds int16 samples in one NumPy array allocated up front. Incoming
+frames are copied in once (straight from the frame's memoryview); readers get
+views into the array rather than new bytes objects. The first `max_read`
+samples are mirrored past the end, so any read of up to `max_read` samples is
+a single contiguous view even when it wraps around.
+
+Decimator downsamples whole batches into a preallocated float32 buffer by an
+integer factor (48 kHz -> 16 kHz is 3), averaging each group of samples, which
+is all the anti-aliasing level and zero-crossing analysis needs.
+"""
+
+import numpy as np
+
+
+class AudioRing:
+    def __init__(self, capacity: int, max_read: int):
+        if max_read > capacity:
+            raise ValueError("max_read cannot exceed capacity")
+        self.capacity = capacity
+        self.max_read = max_read
+        self._buf = np.zeros(capacity + max_read, dtype=np.int16)
+        self.written = 0  # total samples ever written
+        self.consumed = 0  # total samples ever consumed
+        self.dropped = 0  # unread samples overwritten because the reader fell behind
+
+    @property
+    def available(self) -> int:
+        return self.written - self.consumed
+
+    def write(self, samples) -> None:
+        """Copy samples (an int16 array or anything np.frombuffer accepts) into the ring."""
+        if not isinstance(samples, np.ndarray):
+            samples = np.frombuffer(samples, dtype=np.int16)
+        n = len(samples)
+        if n > self.capacity:
+            samples, n = samples[-self.capacity:], self.capacity
+        cap, buf = self.capacity, self._buf
+        start = self.written % cap
+        first = min(n, cap - start)
+        buf[start:start + first] = samples[:first]
+        if first < n:
+            buf[:n - first] = samples[first:]
+        # keep the mirror of the head in sync
+        lo, hi = start, start + n
+        if lo < self.max_read:
+            end = min(hi, self.max_read)
+            buf[cap + lo:cap + end] = buf[lo:end]
+        if hi > cap:
+            end = min(hi - cap, self.max_read)
+            buf[cap:cap + end] = buf[:end]
+        self.written += n
+        overrun = self.written - self.consumed - cap
+        if overrun > 0:
+            self.consumed += overrun
+            self.dropped += overrun
+
+    def peek(self, n: int) -> np.ndarray:
+        """View of the next n unread samples; valid until the next write."""
+        if n > self.available or n > self.max_read:
+            raise ValueError(f"cannot peek {n} samples ({self.available} available, max {self.max_read})")
+        start = self.consumed % self.capacity
+        return self._buf[start:start + n]
+
+    def consume(self, n: int) -> None:
+        self.consumed += min(n, self.available)
+
+    def history(self, n: int) -> np.ndarray:
+        """Copy of the last n consumed samples (fewer if the ring no longer holds them)."""
+        n = min(n, self.consumed, self.capacity - self.available)
+        if n <= 0:
+            return np.empty(0, dtype=np.int16)
+        cap = self.capacity
+        start = (self.consumed - n) % cap
+        if start + n <= cap:
+            return self._buf[start:start + n].copy()
+        return np.concatenate((self._buf[start:cap], self._buf[:start + n - cap]))
+
+
+class Decimator:
+    """Integer-factor downsampling to float32 in a reused buffer."""
+
+    def __init__(self, factor: int, max_batch: int):
+        self.factor = factor
+        self._wide = np.empty(max_batch, dtype=np.float32)
+        self._out = np.empty(max_batch // factor, dtype=np.float32)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Downsample a batch; returns a view of the reused buffer, valid until the next call."""
+        n = len(samples) // self.factor
+        out = self._out[:n]
+        if self.factor == 1:
+            np.copyto(out, samples[:n], casting="unsafe")
+            return out
+        # widen first: mixed int16/float32 ufuncs would allocate cast buffers on every call
+        wide = self._wide[: n * self.factor]
+        np.copyto(wide, samples[: n * self.factor], casting="unsafe")
+        # strided adds; np.add.reduce along a short axis is several times slower
+        np.add(wide[0::self.factor], wide[1::self.factor], out=out)
+        for k in range(2, self.factor):
+            np.add(out, wide[k::self.factor], out=out)
+        np.multiply(out, 1.0 / self.factor, out=out)
+        return out
@@ -0,0 +1,126 @@
+# barge_in.py
+"""
+Fast barge-in: stop the agent the moment the caller starts talking over it.
+
+The LLM and TTS nodes run their streams and synthesis in tasks registered
+with the controller. When the VAD reports start of speech while the agent is
+generating or speaking, the controller clears the outbound audio buffer first
+(so no tail audio is heard), cancels the LLM stream and pending synthesis, and
+asks the session to interrupt the speech handle. The time from speech start to
+every registered task having stopped is observed as the `barge_in` histogram;
+`interruptions` counts them.
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Callable
+
+import metrics
+
+log = logging.getLogger("barge_in")
+
+ENABLED = os.getenv("BARGE_IN", "1").lower() in ("1", "true", "yes")
+
+_DONE = object()
+
+
+class BargeInController:
+    def __init__(
+        self,
+        interrupt: Callable[[], Any] | None = None,
+        clear_audio: Callable[[], Any] | None = None,
+        is_speaking: Callable[[], bool] | None = None,
+    ):
+        self._interrupt = interrupt
+        self._clear_audio = clear_audio
+        self._is_speaking = is_speaking or (lambda: False)
+        self._tasks: set[asyncio.Future] = set()
+        self._pending: set[asyncio.Task] = set()
+
+    def attach(
+        self,
+        interrupt: Callable[[], Any] | None,
+        clear_audio: Callable[[], Any] | None,
+        is_speaking: Callable[[], bool] | None,
+    ) -> None:
+        """Bind to a session once it exists."""
+        self._interrupt = interrupt
+        self._clear_audio = clear_audio
+        self._is_speaking = is_speaking or (lambda: False)
+
+    # --- registration, from the nodes ---
+    def track_task(self, task: asyncio.Future) -> asyncio.Future:
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def guard(self, stream: AsyncIterable) -> AsyncIterator:
+        """Iterate `stream` from a tracked task, so a barge-in can cancel it mid-await."""
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def pump():
+            try:
+                async for item in stream:
+                    queue.put_nowait((True, item))
+            except Exception as e:
+                queue.put_nowait((False, e))
+            finally:
+                queue.put_nowait(_DONE)
+                aclose = getattr(stream, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+
+        task = self.track_task(asyncio.create_task(pump()))
+        try:
+            while (item := await queue.get()) is not _DONE:
+                ok, value = item
+                if not ok:
+                    raise value
+                yield value
+        finally:
+            task.cancel()
+
+    @property
+    def active(self) -> bool:
+        return bool(self._tasks) or self._is_speaking()
+
+    # --- interruption ---
+    def on_speech_start(self, at: float | None = None) -> asyncio.Task | None:
+        """Barge in if the agent is replying; `at` is when speech started (perf_counter)."""
+        if not self.active:
+            return None
+        started = time.perf_counter() if at is None else at
+        # silence first: buffered audio is what the caller would hear
+        if self._clear_audio is not None:
+            try:
+                self._clear_audio()
+            except Exception as e:
+                log.debug("clear_audio failed: %s", e)
+        tasks, self._tasks = list(self._tasks), set()
+        for task in tasks:
+            task.cancel()
+        if self._interrupt is not None:
+            try:
+                result = self._interrupt()
+                if inspect.isawaitable(result):
+                    # resolves once the speech handle is done; not part of the latency
+                    self._keep(asyncio.ensure_future(result))
+            except Exception as e:
+                log.debug("interrupt failed: %s", e)
+        return self._keep(asyncio.create_task(self._finish(started, tasks)))
+
+    def _keep(self, task: asyncio.Future) -> asyncio.Future:
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return task
+
+    async def _finish(self, started: float, tasks: list) -> float:
+        await asyncio.gather(*tasks, return_exceptions=True)
+        latency = time.perf_counter() - started
+        metrics.registry.histogram("barge_in").observe(latency)
+        metrics.registry.inc("interruptions")
+        log.info("✋ Barge-in: stopped %d task(s) in %.0f ms", len(tasks), latency * 1000)
+        return latency
@@ -0,0 +1,219 @@
+# bench_density.py
+"""
+Session density benchmark: how many concurrent calls fit on one core.
+
+Each simulated session does the agent's local per-call work in real time: a
+20 ms audio frame into its own Silero VAD stream, and every couple of seconds
+a "turn" (FAQ match, BM25 retrieval, catalog lookup, reply segmentation). The
+latency measured is how late each 20 ms frame tick runs, which is what a
+caller hears as choppy audio when a worker is oversubscribed.
+
+Sessions run either as threads of one process sharing the VAD model, context,
+index, catalog and FAQ (WORKER_EXECUTOR=thread), or one process per session
+(the default process executor). The session count doubles until p95 tick
+lateness exceeds the SLO, then the largest passing count is reported as
+sessions per core, together with memory per session (PSS where the OS has it).
+
+Usage:
+  python bench_density.py --mode thread --slo-ms 20
+  python bench_density.py --mode process --max-sessions 16
+"""
+
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import threading
+import time
+
+import numpy as np
+import psutil
+
+import catalog
+import context_store
+import faq
+import retrieval
+import segmenter
+
+FRAME_SECS = 0.02
+SAMPLE_RATE = 16000
+TURN_EVERY = 100  # frames, i.e. one turn every 2 s
+QUESTIONS = ["how much is the headset", "what products do you sell", "anything under 50,000", "do you deliver"]
+REPLY = (
+    "Sure, the wireless headset costs ₦45,000.00 and comes with a one year warranty. "
+    "It has noise cancellation, e.g. for calls in busy places. Would you like to order one today?"
+)
+
+
+def load_shared():
+    """Everything a worker process loads once in prewarm."""
+    from livekit.plugins import silero
+
+    snapshot = context_store.get_store().refresh()
+    return {
+        "vad": silero.VAD.load(),
+        "index": retrieval.get_index(snapshot),
+        "catalog": catalog.get_catalog(snapshot),
+        "faq": faq.get_faq(snapshot),
+    }
+
+
+def _frames(rng: np.random.Generator, n: int = 50) -> list:
+    from livekit import rtc
+
+    samples = int(SAMPLE_RATE * FRAME_SECS)
+    out = []
+    for i in range(n):
+        # bursts of noise with pauses, so the VAD sees both speech-like and silent input
+        level = 3000 if (i // 10) % 2 == 0 else 30
+        pcm = (rng.standard_normal(samples) * level).astype(np.int16)
+        out.append(rtc.AudioFrame(pcm.tobytes(), SAMPLE_RATE, 1, samples))
+    return out
+
+
+def _turn(shared: dict, i: int) -> None:
+    question = QUESTIONS[i % len(QUESTIONS)]
+    if shared["faq"].match(question, record=False) is None:
+        retrieval.format_hits(shared["index"].search(question))
+        shared["catalog"].find(question)
+    seg = segmenter.SentenceSegmenter()
+    for word in REPLY.split(" "):
+        seg.push(word + " ")
+    seg.flush()
+
+
+async def run_session(shared: dict, seconds: float, seed: int) -> list[float]:
+    """Feed real-time audio for `seconds`; return how late each frame tick ran."""
+    loop = asyncio.get_running_loop()
+    frames = _frames(np.random.default_rng(seed))
+    stream = shared["vad"].stream()
+
+    async def drain():
+        async for _ in stream:
+            pass
+
+    consumer = asyncio.create_task(drain())
+    lateness = []
+    start = loop.time()
+    ticks = int(seconds / FRAME_SECS)
+    try:
+        for i in range(ticks):
+            due = start + i * FRAME_SECS
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            lateness.append(max(0.0, loop.time() - due))
+            stream.push_frame(frames[i % len(frames)])
+            if i % TURN_EVERY == TURN_EVERY - 1:
+                _turn(shared, i // TURN_EVERY)
+    finally:
+        stream.end_input()
+        consumer.cancel()
+        await asyncio.gather(consumer, return_exceptions=True)
+        await stream.aclose()
+    return lateness
+
+
+def _memory(proc: psutil.Process) -> int:
+    try:
+        info = proc.memory_full_info()
+        return getattr(info, "pss", info.rss)
+    except (psutil.AccessDenied, psutil.NoSuchProcess):
+        return proc.memory_info().rss
+
+
+# --- thread mode: one process, shared resources, a loop per session ---
+def _thread_level(n: int, seconds: float, shared: dict) -> tuple[list[float], int]:
+    go = threading.Barrier(n + 1)
+    results: list[list[float]] = [[] for _ in range(n)]
+
+    def worker(i: int) -> None:
+        go.wait()
+        results[i] = asyncio.run(run_session(shared, seconds, seed=i))
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(n)]
+    for t in threads:
+        t.start()
+    go.wait()
+    time.sleep(seconds / 2)
+    mem = _memory(psutil.Process())
+    for t in threads:
+        t.join()
+    return [x for r in results for x in r], mem
+
+
+# --- process mode: every session loads its own copy ---
+def _process_main(i: int, seconds: float, ready, go, out) -> None:
+    shared = load_shared()
+    ready.put(i)
+    go.wait()
+    out.put(asyncio.run(run_session(shared, seconds, seed=i)))
+
+
+def _process_level(n: int, seconds: float) -> tuple[list[float], int]:
+    ctx = mp.get_context("spawn")
+    ready, out, go = ctx.Queue(), ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=_process_main, args=(i, seconds, ready, go, out), daemon=True) for i in range(n)]
+    for p in procs:
+        p.start()
+    for _ in procs:
+        ready.get()
+    go.set()
+    time.sleep(seconds / 2)
+    mem = sum(_memory(psutil.Process(p.pid)) for p in procs)
+    samples = [x for _ in procs for x in out.get()]
+    for p in procs:
+        p.join()
+    return samples, mem
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("thread", "process"), default=os.getenv("WORKER_EXECUTOR", "thread"))
+    parser.add_argument("--slo-ms", type=float, default=20.0, help="p95 frame tick lateness allowed")
+    parser.add_argument("--seconds", type=float, default=6.0, help="run time per level")
+    parser.add_argument("--start", type=int, default=1)
+    parser.add_argument("--max-sessions", type=int, default=256)
+    args = parser.parse_args()
+
+    from livekit.agents.utils.hw import get_cpu_monitor
+
+    cores = get_cpu_monitor().cpu_count()
+    shared, baseline = None, 0
+    if args.mode == "thread":
+        shared = load_shared()
+        baseline = _memory(psutil.Process())
+        print(f"shared resources loaded, process memory {baseline / 2**20:.0f} MB")
+    print(f"mode={args.mode} cores={cores:g} slo=p95 {args.slo_ms:g} ms\n")
+    print(f"{'sessions':>8} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'cpu %':>6} {'mem MB':>7} {'MB/sess':>8}  SLO")
+
+    best = None
+    n = args.start
+    while n <= args.max_sessions:
+        psutil.cpu_percent(None)
+        if args.mode == "thread":
+            samples, mem = _thread_level(n, args.seconds, shared)
+        else:
+            samples, mem = _process_level(n, args.seconds)
+        cpu = psutil.cpu_percent(None)
+        p50, p95, p99 = (float(np.percentile(samples, q)) * 1000 for q in (50, 95, 99))
+        per_session = (mem - baseline) / n / 2**20
+        ok = p95 <= args.slo_ms
+        print(f"{n:>8} {p50:>7.1f} {p95:>7.1f} {p99:>7.1f} {cpu:>6.0f} {mem / 2**20:>7.0f} {per_session:>8.1f}  {'ok' if ok else 'MISS'}")
+        if not ok:
+            break
+        best = (n, per_session)
+        n *= 2
+
+    print()
+    if best is None:
+        print(f"Even {args.start} session(s) miss the SLO on this machine.")
+        return
+    n, per_session = best
+    capped = "at least " if n * 2 > args.max_sessions else ""
+    print(f"{n} sessions within SLO → {capped}{n / cores:.1f} sessions per core, {per_session:.1f} MB per session"
+          + (f" (+{baseline / 2**20:.0f} MB shared)" if baseline else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# catalog.py
+"""
+Typed product catalog parsed from the *.json files in context/.
+
+Prices such as "₦50,000" are normalized to a float plus an ISO currency code so
+budget questions can be answered locally instead of by the LLM. Products are
+indexed by id, by name token and by price (sorted, searched with bisect).
+"""
+
+import bisect
+import json
+import logging
+import re
+import threading
+from typing import Mapping
+
+from retrieval import tokenize
+
+log = logging.getLogger("catalog")
+
+CURRENCY_SYMBOLS = {"₦": "NGN", "$": "USD", "€": "EUR", "£": "GBP", "₵": "GHS", "KSh": "KES"}
+_SYMBOL_FOR = {code: sym for sym, code in CURRENCY_SYMBOLS.items()}
+_PRICE_RE = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*([kKmM])?")
+_CODE_RE = re.compile(r"\b([A-Z]{3})\b")
+
+
+def parse_price(text, default_currency: str = "NGN") -> tuple[float | None, str]:
+    """Parse "₦50,000", "NGN 50000", "$1.5k" or a bare number into (amount, currency)."""
+    if isinstance(text, (int, float)):
+        return float(text), default_currency
+    text = str(text or "").strip()
+    currency = default_currency
+    for sym, code in CURRENCY_SYMBOLS.items():
+        if sym in text:
+            currency = code
+            break
+    else:
+        m = _CODE_RE.search(text)
+        if m:
+            currency = m.group(1)
+    m = _PRICE_RE.search(text)
+    if not m:
+        return None, currency
+    amount = float(m.group(1).replace(",", ""))
+    suffix = (m.group(2) or "").lower()
+    amount *= {"k": 1_000, "m": 1_000_000}.get(suffix, 1)
+    return amount, currency
+
+
+def normalize_currency(text: str) -> str | None:
+    """ISO code for "$", "usd" or "USD"; None if unrecognized."""
+    text = (text or "").strip()
+    if text in CURRENCY_SYMBOLS:
+        return CURRENCY_SYMBOLS[text]
+    return text.upper() if re.fullmatch(r"[A-Za-z]{3}", text) else None
+
+
+def format_price(amount: float | None, currency: str) -> str:
+    if amount is None:
+        return "price on request"
+    value = f"{amount:,.0f}" if amount == int(amount) else f"{amount:,.2f}"
+    sym = _SYMBOL_FOR.get(currency)
+    return f"{sym}{value}" if sym else f"{value} {currency}"
+
+
+class Product:
+    __slots__ = ("id", "name", "price", "currency", "description", "tokens")
+
+    def __init__(self, id: str, name: str, price: float | None, currency: str, description: str = ""):
+        self.id = id
+        self.name = name
+        self.price = price
+        self.currency = currency
+        self.description = description
+        self.tokens = frozenset(tokenize(name))
+
+    @property
+    def price_text(self) -> str:
+        return format_price(self.price, self.currency)
+
+    def describe(self) -> str:
+        text = f"{self.name}: {self.price_text}"
+        return f"{text}. {self.description}" if self.description else text
+
+    def __repr__(self) -> str:
+        return f"Product({self.id!r}, {self.name!r}, {self.price!r}, {self.currency!r})"
+
+
+class Catalog:
+    def __init__(self, products: list[Product]):
+        self.by_id: dict[str, Product] = {}
+        self._by_token: dict[str, list[Product]] = {}
+        for p in products:
+            self.by_id[p.id] = p
+            for tok in p.tokens:
+                self._by_token.setdefault(tok, []).append(p)
+        priced = sorted((p for p in self.by_id.values() if p.price is not None), key=lambda p: p.price)
+        self._by_price = priced
+        self._prices = [p.price for p in priced]
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def __iter__(self):
+        return iter(self.by_id.values())
+
+    @classmethod
+    def from_files(cls, files: Mapping[str, str]) -> "Catalog":
+        products = []
+        for name, content in files.items():
+            if not name.endswith(".json"):
+                continue
+            try:
+                data = json.loads(content)
+            except ValueError as e:
+                log.warning("Skipped catalog %s: %s", name, e)
+                continue
+            for i, item in enumerate(data if isinstance(data, list) else [data]):
+                if not isinstance(item, dict) or not item.get("name"):
+                    continue
+                price, currency = parse_price(item.get("price"), item.get("currency") or "NGN")
+                products.append(Product(
+                    str(item.get("id") or f"{name}#{i}"),
+                    str(item["name"]),
+                    price,
+                    currency,
+                    str(item.get("description") or ""),
+                ))
+        return cls(products)
+
+    def find(self, query: str, limit: int = 3, min_overlap: float = 0.0) -> list[Product]:
+        """Products whose name shares the most tokens with `query`.
+
+        min_overlap is the fraction of the query's tokens a name must contain;
+        1.0 accepts only names that cover the whole query.
+        """
+        if query in self.by_id:
+            return [self.by_id[query]]
+        query_tokens = set(tokenize(query))
+        scores: dict[str, int] = {}
+        for tok in query_tokens:
+            for p in self._by_token.get(tok, ()):
+                scores[p.id] = scores.get(p.id, 0) + 1
+        needed = min_overlap * len(query_tokens)
+        ranked = sorted(
+            (pid for pid, score in scores.items() if score >= needed),
+            key=lambda pid: (-scores[pid], len(self.by_id[pid].tokens)),
+        )
+        return [self.by_id[pid] for pid in ranked[:limit]]
+
+    @property
+    def currencies(self) -> set[str]:
+        return {p.currency for p in self._by_price}
+
+    def in_budget(self, max_price: float, min_price: float = 0.0, currency: str | None = None) -> list[Product]:
+        """Products priced within [min_price, max_price], cheapest first; only `currency` prices when given."""
+        lo = bisect.bisect_left(self._prices, min_price)
+        hi = bisect.bisect_right(self._prices, max_price)
+        return [p for p in self._by_price[lo:hi] if currency is None or p.currency == currency]
+
+
+_catalog: Catalog | None = None
+_catalog_version = -1
+_catalog_lock = threading.Lock()
+
+
+def get_catalog(snapshot) -> Catalog:
+    """Catalog for a context snapshot, rebuilt only when the snapshot version changes."""
+    global _catalog, _catalog_version
+    with _catalog_lock:
+        if _catalog is None or _catalog_version != snapshot.version:
+            _catalog = Catalog.from_files(snapshot.files)
+            _catalog_version = snapshot.version
+            log.info("Catalog: %d product(s) from context v%d", len(_catalog), snapshot.version)
+        return _catalog
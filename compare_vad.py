@@ -0,0 +1,152 @@
+# compare_vad.py
+"""
+Compare the energy VAD with Silero on recorded clips.
+
+For each 16-bit PCM WAV clip, both VADs get the audio in 20 ms frames. The
+script reports their speech segments, frame-level agreement (Silero as the
+reference), start/end-of-speech detection delay relative to Silero, and CPU
+cost as a real-time factor. With no clips, a synthetic clip with known speech
+regions is generated and both VADs are also scored against the truth. Silero
+is trained on real voices and may ignore the synthetic one, so use recorded
+clips for the Silero comparison itself.
+
+Usage:
+  python compare_vad.py clip1.wav clip2.wav
+  python compare_vad.py            # synthetic clip
+"""
+
+import asyncio
+import sys
+import time
+import wave
+
+import numpy as np
+
+import energy_vad
+
+FRAME_SECS = 0.02
+GRID = energy_vad.WINDOW_SECS
+
+
+def read_wav(path: str) -> tuple[np.ndarray, int]:
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise SystemExit(f"{path}: only 16-bit PCM WAV is supported")
+        pcm = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        channels, rate = f.getnchannels(), f.getframerate()
+    if channels > 1:
+        pcm = pcm.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return pcm, rate
+
+
+def synthetic_clip(rate: int = 16000, seed: int = 7) -> tuple[np.ndarray, int, list[tuple[float, float]]]:
+    """Voiced, syllable-modulated bursts over background noise, with their true extents."""
+    rng = np.random.default_rng(seed)
+    total = 12.0
+    truth = [(1.0, 2.6), (3.4, 4.1), (5.5, 8.0), (9.2, 10.4)]
+    t = np.arange(int(total * rate)) / rate
+    audio = rng.standard_normal(len(t)) * 150  # room noise around -47 dBFS
+    for start, end in truth:
+        m = (t >= start) & (t < end)
+        tt = t[m] - start
+        f0 = 140 + 30 * np.sin(2 * np.pi * 0.7 * tt)
+        phase = 2 * np.pi * np.cumsum(f0) / rate
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+        syllables = 0.55 + 0.45 * np.abs(np.sin(2 * np.pi * 2.0 * tt))
+        audio[m] += voiced * syllables * 5000
+    return np.clip(audio, -32768, 32767).astype(np.int16), rate, truth
+
+
+async def run_vad(model, pcm: np.ndarray, rate: int) -> tuple[list[tuple[float, float]], float]:
+    """Return (speech segments, cpu seconds) for one pass over the clip."""
+    from livekit import rtc
+    from livekit.agents import vad
+
+    step = int(rate * FRAME_SECS)
+    stream = model.stream()
+    segments = []
+    cpu = time.process_time()
+
+    async def collect():
+        onset = None
+        async for ev in stream:
+            if ev.type == vad.VADEventType.START_OF_SPEECH:
+                onset = ev.timestamp - ev.speech_duration
+            elif ev.type == vad.VADEventType.END_OF_SPEECH and onset is not None:
+                segments.append((onset, ev.timestamp - ev.silence_duration))
+                onset = None
+        if onset is not None:
+            segments.append((onset, len(pcm) / rate))
+
+    consumer = asyncio.create_task(collect())
+    for i in range(0, len(pcm) - step + 1, step):
+        stream.push_frame(rtc.AudioFrame(pcm[i:i + step].tobytes(), rate, 1, step))
+        if i // step % 50 == 0:
+            await asyncio.sleep(0)
+    # trailing silence so the last utterance can close
+    silence = np.zeros(step, dtype=np.int16).tobytes()
+    for _ in range(int(1.0 / FRAME_SECS)):
+        stream.push_frame(rtc.AudioFrame(silence, rate, 1, step))
+    stream.end_input()
+    await consumer
+    await stream.aclose()
+    return segments, time.process_time() - cpu
+
+
+def labels(segments: list[tuple[float, float]], duration: float) -> np.ndarray:
+    grid = np.zeros(int(duration / GRID), dtype=bool)
+    for start, end in segments:
+        grid[int(max(0.0, start) / GRID):int(end / GRID)] = True
+    return grid
+
+
+def agreement(pred: np.ndarray, ref: np.ndarray) -> str:
+    tp = np.count_nonzero(pred & ref)
+    precision = tp / max(1, np.count_nonzero(pred))
+    recall = tp / max(1, np.count_nonzero(ref))
+    f1 = 2 * precision * recall / max(1e-9, precision + recall)
+    return f"P={precision:.2f} R={recall:.2f} F1={f1:.2f} acc={np.mean(pred == ref):.2f}"
+
+
+def delays(segments, reference) -> str:
+    """Median start/end boundary difference against the nearest reference segment."""
+    if not segments or not reference:
+        return "n/a"
+    ds = [min((s - r[0] for r in reference), key=abs) for s, _ in segments]
+    de = [min((e - r[1] for r in reference), key=abs) for _, e in segments]
+    return f"start {np.median(ds) * 1000:+.0f} ms, end {np.median(de) * 1000:+.0f} ms"
+
+
+async def compare(name: str, pcm: np.ndarray, rate: int, truth=None) -> None:
+    from livekit.plugins import silero
+
+    duration = len(pcm) / rate
+    results = {
+        "silero": await run_vad(silero.VAD.load(), pcm, rate),
+        "energy": await run_vad(energy_vad.EnergyVAD.load(), pcm, rate),
+    }
+    print(f"\n=== {name} ({duration:.1f}s @ {rate} Hz) ===")
+    for vad_name, (segments, cpu) in results.items():
+        print(f"{vad_name:>7}: {len(segments)} segments, CPU {cpu * 1000:.0f} ms (RTF {cpu / duration:.4f})")
+        print("         " + ", ".join(f"{s:.2f}-{e:.2f}" for s, e in segments))
+    ref = results["silero"][0]
+    print(f" energy vs silero: {agreement(labels(results['energy'][0], duration), labels(ref, duration))}; "
+          f"{delays(results['energy'][0], ref)}")
+    if truth is not None:
+        for vad_name, (segments, _) in results.items():
+            print(f" {vad_name:>6} vs truth: {agreement(labels(segments, duration), labels(truth, duration))}; "
+                  f"{delays(segments, truth)}")
+
+
+async def main(paths: list[str]) -> None:
+    if not paths:
+        pcm, rate, truth = synthetic_clip()
+        await compare("synthetic", pcm, rate, truth)
+        return
+    for path in paths:
+        pcm, rate = read_wav(path)
+        await compare(path, pcm, rate)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
@@ -11,6 +11,8 @@ from pathlib import Path
 from dotenv import load_dotenv
 import os
 
+import memory
+
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 log = logging.getLogger()
 
@@ -58,6 +60,7 @@ async def chat_with_agent(llm, instructions):
     log.info("Type your questions below. Type 'quit' or 'exit' to end.\n")
     
     conversation_history = []
+    history = memory.ConversationMemory(memory.llm_summarizer(llm))
     
     while True:
         try:
@@ -77,11 +80,22 @@ async def chat_with_agent(llm, instructions):
                 "content": user_input
             })
             
-            # Build messages for LLM
-            messages = [
-                {"role": "system", "content": instructions},
-                *conversation_history
-            ]
+            # Build messages for LLM: system prompt, rolling summary, recent turns
+            turns = []
+            for msg in conversation_history:
+                if msg["role"] == "user" or not turns:
+                    turns.append([])
+                turns[-1].append(msg)
+            summary, recent, prompt_tokens = history.select(
+                turns,
+                lambda m: f"{m['role']}: {m['content']}",
+                memory.estimate_tokens(instructions),
+            )
+            messages = [{"role": "system", "content": instructions}]
+            if summary:
+                messages.append({"role": "system", "content": f"Summary of the earlier conversation: {summary}"})
+            messages += [msg for turn in recent for msg in turn]
+            log.info(f"(prompt: ~{prompt_tokens} tokens)")
             
             # Get response
             log.info("Agent: ", end="", flush=True)
@@ -0,0 +1,130 @@
+# context_store.py
+"""
+Worker-level store for the files in context/.
+
+The store loads context/ once per process, remembers each file's mtime and size,
+and re-reads only the files that changed. Jobs get an immutable snapshot in O(1);
+the directory scan runs in a thread so it never blocks the event loop.
+
+FAQ_FILE is in the snapshot's files for faq.py but is not context: it is left
+out of the rendered text and the retrieval index, so a canned answer the FAQ
+cache has dropped as stale never reaches the LLM as a fact.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
+
+log = logging.getLogger("context_store")
+
+CONTEXT_DIR = Path("context")
+FAQ_FILE = "faq.json"
+# seconds between directory scans; jobs arriving in between reuse the snapshot
+REFRESH_INTERVAL = float(os.getenv("CONTEXT_REFRESH_INTERVAL", "5"))
+
+
+class ContextSnapshot(NamedTuple):
+    """Immutable view of context/ at one point in time."""
+    version: int
+    files: Mapping[str, str]
+    text: str
+
+
+class _FileEntry(NamedTuple):
+    mtime_ns: int
+    size: int
+    content: str
+
+
+def _render(files: Mapping[str, str]) -> str:
+    all_content = ""
+    for name, content in files.items():
+        if name == FAQ_FILE:
+            continue
+        all_content += f"\n=== {name} ===\n{content}\n"
+    return all_content.strip() or "No context files found"
+
+
+class ContextStore:
+    def __init__(self, context_dir: Path = CONTEXT_DIR, refresh_interval: float = REFRESH_INTERVAL):
+        self._dir = Path(context_dir)
+        self._interval = refresh_interval
+        self._entries: dict[str, _FileEntry] = {}
+        self._snapshot = ContextSnapshot(0, MappingProxyType({}), _render({}))
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+        self._inflight: asyncio.Future | None = None
+
+    @property
+    def snapshot(self) -> ContextSnapshot:
+        return self._snapshot
+
+    def refresh(self) -> ContextSnapshot:
+        """Scan context/ and rebuild the snapshot if any file was added, changed or removed."""
+        with self._lock:
+            self._dir.mkdir(exist_ok=True)
+            entries: dict[str, _FileEntry] = {}
+            changed = []
+            for file_path in sorted(self._dir.glob("*")):
+                if not file_path.is_file():
+                    continue
+                name = file_path.name
+                try:
+                    st = file_path.stat()
+                except OSError as e:
+                    log.warning("Skipped %s: %s", name, e)
+                    continue
+                old = self._entries.get(name)
+                if old and old.mtime_ns == st.st_mtime_ns and old.size == st.st_size:
+                    entries[name] = old
+                    continue
+                try:
+                    content = file_path.read_text(encoding="utf-8")
+                except Exception as e:
+                    log.warning("Skipped %s: %s", name, e)
+                    continue
+                entries[name] = _FileEntry(st.st_mtime_ns, st.st_size, content)
+                changed.append(name)
+
+            removed = self._entries.keys() - entries.keys()
+            self._checked_at = time.monotonic()
+            if changed or removed or self._snapshot.version == 0:
+                self._entries = entries
+                files = {name: e.content for name, e in entries.items()}
+                self._snapshot = ContextSnapshot(
+                    self._snapshot.version + 1, MappingProxyType(files), _render(files)
+                )
+                log.info(
+                    "Context v%d: %d file(s), %d changed, %d removed",
+                    self._snapshot.version, len(files), len(changed), len(removed),
+                )
+            return self._snapshot
+
+    async def refresh_async(self, force: bool = False) -> ContextSnapshot:
+        """Return the current snapshot, rescanning in a thread once the refresh interval has passed."""
+        if not force and time.monotonic() - self._checked_at < self._interval:
+            return self._snapshot
+        # concurrent jobs on the same loop share a single scan
+        loop = asyncio.get_running_loop()
+        if self._inflight is None or self._inflight.done() or self._inflight.get_loop() is not loop:
+            self._inflight = asyncio.ensure_future(asyncio.to_thread(self.refresh))
+        return await asyncio.shield(self._inflight)
+
+
+_store: ContextStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ContextStore:
+    """Process-wide context store."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ContextStore()
+    return _store
@@ -0,0 +1,257 @@
+# energy_vad.py
+"""
+Lightweight energy + zero-crossing VAD, used when Silero is not available.
+
+Audio is copied once into a preallocated ring (audio_ring), decimated to
+16 kHz in batches and cut into 20 ms windows scored with NumPy in one pass:
+level in dBFS against an adaptive noise floor, and the zero-crossing rate,
+which separates voiced speech from hiss and broadband noise. Short dips inside
+words are bridged by a hangover, and start/end of speech follow the same
+min_speech_duration / min_silence_duration rules as the Silero plugin, so it
+drops into Agent(vad=...) unchanged. It costs a few microseconds per window.
+It is the fallback only: with Silero available, the plugin does its own
+frame handling and this path is not used.
+"""
+
+import logging
+import math
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import vad
+
+import audio_ring
+
+log = logging.getLogger("energy_vad")
+
+WINDOW_SECS = 0.02
+ANALYSIS_RATE = 16000
+# windows scored per NumPy pass when frames arrive in bursts
+BATCH_WINDOWS = 10
+# loud windows count as speech even with a high zero-crossing rate (fricatives: "s", "f")
+LOUD_MARGIN_DB = 10.0
+
+
+@dataclass
+class EnergyVADOptions:
+    min_speech_duration: float = 0.06
+    min_silence_duration: float = 0.55
+    prefix_padding_duration: float = 0.5
+    max_buffered_speech: float = 60.0
+    hangover_duration: float = 0.12
+    margin_db: float = 12.0
+    min_energy_db: float = -50.0
+    max_zcr: float = 0.35
+    activation_threshold: float = 0.5
+
+
+class EnergyVAD(vad.VAD):
+    @classmethod
+    def load(cls, **kwargs) -> "EnergyVAD":
+        """Same calling convention as silero.VAD.load(); nothing to load, so it is instant."""
+        return cls(EnergyVADOptions(**kwargs))
+
+    def __init__(self, opts: EnergyVADOptions | None = None):
+        super().__init__(capabilities=vad.VADCapabilities(update_interval=WINDOW_SECS))
+        self._opts = opts or EnergyVADOptions()
+
+    @property
+    def model(self) -> str:
+        return "energy-zcr"
+
+    @property
+    def provider(self) -> str:
+        return "local"
+
+    def stream(self) -> "EnergyVADStream":
+        return EnergyVADStream(self, self._opts)
+
+
+def score_windows(samples: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """Level in dBFS and zero-crossing rate for each full window of mono samples (int16 scale)."""
+    samples = np.asarray(samples, dtype=np.float32)
+    return WindowScorer(window, len(samples) // window).score(samples)
+
+
+class WindowScorer:
+    """score_windows with reused scratch arrays, for the per-frame path."""
+
+    def __init__(self, window: int, max_windows: int):
+        self.window = window
+        self._scale = 1.0 / (window * 32768.0 * 32768.0)
+        self._energy = np.empty(max_windows, dtype=np.float32)
+        self._zcr = np.empty(max_windows, dtype=np.float32)
+        self._signs = np.empty((max_windows, window), dtype=bool)
+        self._flips = np.empty((max_windows, window - 1), dtype=bool)
+
+    def score(self, samples: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Scores for float32 samples; views of reused arrays, valid until the next call."""
+        window = self.window
+        n = len(samples) // window
+        frames = samples[: n * window].reshape(n, window)
+        signs = np.signbit(frames, out=self._signs[:n])
+        flips = np.not_equal(signs[:, 1:], signs[:, :-1], out=self._flips[:n])
+        energy_db, zcr = self._energy[:n], self._zcr[:n]
+        # row by row: a frame brings one or two windows, where per-call overhead
+        # of the axis-wise ufuncs costs more than the arithmetic
+        for i in range(n):
+            row = frames[i]
+            energy_db[i] = 10.0 * math.log10(float(np.dot(row, row)) * self._scale + 1e-10)
+            zcr[i] = np.count_nonzero(flips[i]) / (window - 1)
+        return energy_db, zcr
+
+
+class EnergyVADStream(vad.VADStream):
+    def __init__(self, vad_: EnergyVAD, opts: EnergyVADOptions):
+        self._opts = opts
+        super().__init__(vad_)
+
+    async def _main_task(self) -> None:
+        opts = self._opts
+        sample_rate = 0
+        window = 0
+        ring: audio_ring.AudioRing | None = None
+        decimator: audio_ring.Decimator | None = None
+        scorer: WindowScorer | None = None
+        max_zcr = opts.max_zcr
+        noise_db = -60.0
+        prefix_samples = 0
+
+        speaking = False
+        speech_acc = silence_acc = 0.0
+        pub_speech = pub_silence = 0.0
+        since_voiced = math.inf
+        utterance = 0  # samples since the start of speech
+        samples_index = 0
+        timestamp = 0.0
+
+        def reset() -> None:
+            nonlocal speaking, speech_acc, silence_acc, pub_speech, pub_silence
+            nonlocal since_voiced, utterance, samples_index, timestamp
+            if ring is not None:
+                ring.consume(ring.available)
+            speaking = False
+            speech_acc = silence_acc = pub_speech = pub_silence = 0.0
+            since_voiced = math.inf
+            utterance = samples_index = 0
+            timestamp = 0.0
+
+        def speech_frame(samples: int) -> rtc.AudioFrame:
+            data = ring.history(samples)
+            return rtc.AudioFrame(data.tobytes(), sample_rate, 1, len(data))
+
+        async for item in self._input_ch:
+            if isinstance(item, self._FlushSentinel):
+                reset()
+                continue
+            if not isinstance(item, rtc.AudioFrame):
+                continue
+            if not sample_rate:
+                sample_rate = item.sample_rate
+                window = int(sample_rate * WINDOW_SECS)
+                # analyse at 16 kHz when the rate allows, so zero-crossing rates stay comparable
+                factor = sample_rate // ANALYSIS_RATE if sample_rate % ANALYSIS_RATE == 0 else 1
+                max_zcr = opts.max_zcr * ANALYSIS_RATE * factor / sample_rate
+                batch = window * BATCH_WINDOWS
+                prefix_samples = int(opts.prefix_padding_duration * sample_rate)
+                capacity = int(opts.max_buffered_speech * sample_rate) + prefix_samples + batch
+                ring = audio_ring.AudioRing(capacity, batch)
+                decimator = audio_ring.Decimator(factor, batch)
+                scorer = WindowScorer(window // factor, BATCH_WINDOWS)
+            elif item.sample_rate != sample_rate:
+                log.error("a frame with another sample rate was already pushed")
+                continue
+
+            pcm = np.frombuffer(item.data, dtype=np.int16)
+            if item.num_channels > 1:
+                pcm = pcm.reshape(-1, item.num_channels).mean(axis=1).astype(np.int16)
+            ring.write(pcm)
+
+            while ring.available >= window:
+                started = time.perf_counter()
+                n = min(ring.available // window, BATCH_WINDOWS)
+                view = ring.peek(n * window)
+                analysed = decimator.process(view)
+                energy_db, zcr = scorer.score(analysed)
+                per_window = (time.perf_counter() - started) / n
+
+                for i in range(n):
+                    e = float(energy_db[i])
+                    threshold = max(opts.min_energy_db, noise_db + opts.margin_db)
+                    p = 1.0 / (1.0 + math.exp(-(e - threshold) / 3.0))
+                    if zcr[i] > max_zcr and e < threshold + LOUD_MARGIN_DB:
+                        p *= 0.5  # noisy, unvoiced window
+                    voiced = p >= opts.activation_threshold
+
+                    # noise floor: falls quickly, rises slowly, frozen while voiced
+                    if not voiced:
+                        noise_db += (0.3 if e < noise_db else 0.02) * (e - noise_db)
+
+                    since_voiced = 0.0 if voiced else since_voiced + WINDOW_SECS
+                    active = voiced or since_voiced <= opts.hangover_duration
+
+                    chunk = view[i * window:(i + 1) * window]
+                    ring.consume(window)
+                    samples_index += window
+                    timestamp += WINDOW_SECS
+                    if speaking:
+                        pub_speech += WINDOW_SECS
+                        utterance += window
+                    else:
+                        pub_silence += WINDOW_SECS
+
+                    self._event_ch.send_nowait(
+                        vad.VADEvent(
+                            type=vad.VADEventType.INFERENCE_DONE,
+                            samples_index=samples_index,
+                            timestamp=timestamp,
+                            speech_duration=pub_speech,
+                            silence_duration=pub_silence,
+                            frames=[rtc.AudioFrame(chunk.tobytes(), sample_rate, 1, window)],
+                            probability=p,
+                            inference_duration=per_window,
+                            speaking=speaking,
+                            raw_accumulated_speech=speech_acc,
+                            raw_accumulated_silence=silence_acc,
+                        )
+                    )
+
+                    if active:
+                        speech_acc += WINDOW_SECS
+                        silence_acc = 0.0
+                        if not speaking and speech_acc >= opts.min_speech_duration:
+                            speaking = True
+                            pub_silence, pub_speech = 0.0, speech_acc
+                            utterance = round(speech_acc / WINDOW_SECS) * window
+                            self._event_ch.send_nowait(
+                                vad.VADEvent(
+                                    type=vad.VADEventType.START_OF_SPEECH,
+                                    samples_index=samples_index,
+                                    timestamp=timestamp,
+                                    speech_duration=pub_speech,
+                                    silence_duration=0.0,
+                                    frames=[speech_frame(prefix_samples + utterance)],
+                                    speaking=True,
+                                )
+                            )
+                    else:
+                        silence_acc += WINDOW_SECS
+                        speech_acc = 0.0
+                        if speaking and silence_acc >= opts.min_silence_duration:
+                            speaking = False
+                            pub_silence = silence_acc
+                            self._event_ch.send_nowait(
+                                vad.VADEvent(
+                                    type=vad.VADEventType.END_OF_SPEECH,
+                                    samples_index=samples_index,
+                                    timestamp=timestamp,
+                                    speech_duration=max(0.0, pub_speech - silence_acc),
+                                    silence_duration=pub_silence,
+                                    frames=[speech_frame(prefix_samples + utterance)],
+                                    speaking=False,
+                                )
+                            )
+                            pub_speech = 0.0
+                            utterance = 0
@@ -0,0 +1,230 @@
+# event_store.py
+"""
+Write-behind store for call transcripts and per-turn events.
+
+Sessions hand records to record(), which only does a non-blocking put on a
+bounded queue, so nothing on the audio loop ever waits for disk. One writer
+thread per worker process drains the queue in batches (EVENT_BATCH_SIZE
+records, or whatever arrived within EVENT_FLUSH_INTERVAL) into either an
+append-only JSONL file or SQLite (EVENT_STORE=jsonl|sqlite|off). When the
+queue is full the record is dropped and counted instead of blocking the caller.
+
+Exposed through metrics: the `event_queue_depth` gauge, the `event_flush`
+histogram (time to write one batch), and the `events_written`,
+`events_dropped` and `events_failed` counters.
+"""
+
+import asyncio
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import handoff
+import metrics
+
+log = logging.getLogger("event_store")
+
+BACKEND = os.getenv("EVENT_STORE", "jsonl").lower()
+STORE_PATH = os.getenv("EVENT_STORE_PATH", "")  # default: call_events.jsonl / call_events.db in handoff.STATE_HOME
+QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "10000"))
+BATCH_SIZE = int(os.getenv("EVENT_BATCH_SIZE", "256"))
+FLUSH_INTERVAL = float(os.getenv("EVENT_FLUSH_INTERVAL", "0.5"))
+
+_STOP = object()
+
+
+class JsonlSink:
+    """One JSON object per line; each batch is a single append, so processes sharing the file do not interleave lines."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def write(self, batch: list[dict]) -> None:
+        data = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in batch).encode()
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._fd, view):]
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class SqliteSink:
+    """Table `events`: the common columns plus the full record as JSON. WAL lets several workers share the file."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # opened here, used only by the writer thread
+        self._db = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "ts REAL NOT NULL, room TEXT, session_id TEXT, event TEXT NOT NULL, data TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS events_session ON events (session_id, ts)")
+        self._db.commit()
+
+    def write(self, batch: list[dict]) -> None:
+        with self._db:
+            self._db.executemany(
+                "INSERT INTO events (ts, room, session_id, event, data) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (r.get("ts"), r.get("room"), r.get("session_id"), r.get("event"), json.dumps(r, ensure_ascii=False))
+                    for r in batch
+                ],
+            )
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class EventStore:
+    def __init__(self, sink, queue_size: int = QUEUE_SIZE, batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL):
+        self._sink = sink
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._batch_size = batch_size
+        self._interval = flush_interval
+        self._enqueued = 0
+        self._done = 0  # records written or failed, in queue order
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True, name="event_store")
+        self._thread.start()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def record(self, event: dict[str, Any]) -> bool:
+        """Queue a record without blocking; False (and counted) if it was dropped."""
+        if self._closed:
+            return False
+        try:
+            with self._cond:  # keeps _enqueued in step with queue order for flush()
+                self._queue.put_nowait(event)
+                self._enqueued += 1
+        except queue.Full:
+            metrics.registry.inc("events_dropped")
+            return False
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything queued so far is written; False on timeout. Not for the event loop."""
+        with self._cond:
+            target = self._enqueued
+            return self._cond.wait_for(lambda: self._done >= target, timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            log.warning("Event writer still busy; %d record(s) not written", self.depth)
+            return
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self._sink.close()
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self._interval
+            while len(batch) < self._batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+
+    def _write(self, batch: list[dict]) -> None:
+        started = time.perf_counter()
+        try:
+            self._sink.write(batch)
+            metrics.registry.inc("events_written", len(batch))
+        except Exception as e:
+            metrics.registry.inc("events_failed", len(batch))
+            log.error("Writing %d event(s) failed: %s", len(batch), e)
+        metrics.registry.histogram("event_flush").observe(time.perf_counter() - started)
+        with self._cond:
+            self._done += len(batch)
+            self._cond.notify_all()
+
+
+class _NullStore:
+    depth = 0
+
+    def record(self, event: dict[str, Any]) -> bool:
+        return False
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        pass
+
+
+_store: EventStore | _NullStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> EventStore | _NullStore:
+    """The process-wide store, opened on first use from EVENT_STORE / EVENT_STORE_PATH."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if BACKEND == "sqlite":
+                _store = EventStore(SqliteSink(STORE_PATH or handoff.STATE_HOME / "call_events.db"))
+            elif BACKEND == "jsonl":
+                _store = EventStore(JsonlSink(STORE_PATH or handoff.STATE_HOME / "call_events.jsonl"))
+            else:
+                _store = _NullStore()
+            atexit.register(_store.close)
+            metrics.registry.gauge("event_queue_depth", lambda: _store.depth)
+        return _store
+
+
+class CallRecorder:
+    """Stamps records with the call they belong to."""
+
+    def __init__(self, room: str, session_id: str, store: EventStore | _NullStore | None = None):
+        self.room = room
+        self.session_id = session_id
+        self._store = store or get_store()
+
+    def record(self, event: str, **fields: Any) -> bool:
+        return self._store.record(
+            {"ts": time.time(), "event": event, "room": self.room, "session_id": self.session_id, **fields}
+        )
+
+    def transcript(self, role: str, text: str, **fields: Any) -> bool:
+        return self.record("transcript", role=role, text=text, **fields)
+
+    def turn(self, timings: dict[str, Any]) -> bool:
+        """TurnTracker sink: the finished turn's stage timings."""
+        return self._store.record({"ts": time.time(), **timings})
+
+    async def aflush(self, timeout: float = 2.0) -> bool:
+        return await asyncio.to_thread(self._store.flush, timeout)
@@ -0,0 +1,149 @@
+# faq.py
+"""
+Answer cache for the questions callers ask over and over.
+
+Seeded from context/faq.json (question, optional aliases, answer). Utterances
+are matched exactly after normalization, then by tokens: every content word of
+the utterance must appear in the question, which must be mostly covered, so a
+question with an extra qualifier ("in dollars", "monthly") goes to the LLM. A
+near-identical character match is accepted for transcription noise. Only a
+confident match is answered without the LLM.
+
+The cache is rebuilt whenever the context snapshot changes. Answers that quote
+a price for a catalog product are checked against the catalog, and dropped
+when it has changed, so a price edit in product.json is never answered from
+an out-of-date faq.json.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from difflib import SequenceMatcher
+from typing import Mapping, NamedTuple
+
+import catalog
+import context_store
+from retrieval import tokenize
+
+log = logging.getLogger("faq")
+
+FAQ_FILE = context_store.FAQ_FILE
+MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.75"))
+# near-identical strings (STT spelling noise) match even when tokens differ
+CHAR_MATCH_RATIO = 0.95
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_PRICE_MENTION_RE = re.compile(r"(?:[₦$€£₵]|KSh|\b[A-Z]{3}\b)\s?\d[\d,]*(?:\.\d+)?\s*[kKmM]?\b")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    text = _PUNCT_RE.sub(" ", text.casefold())
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def stale_product(answer: str, products: catalog.Catalog) -> str | None:
+    """Name of a product the answer quotes a price for that differs from the catalog's, if any."""
+    quoted = {catalog.parse_price(m.group())[0] for m in _PRICE_MENTION_RE.finditer(answer)}
+    if not quoted:
+        return None
+    text = normalize(answer)
+    for product in products:
+        if normalize(product.name) in text and product.price not in quoted:
+            return product.name
+    return None
+
+
+class _Entry(NamedTuple):
+    question: str
+    tokens: frozenset
+    answer: str
+
+
+class FAQCache:
+    def __init__(self, items: list[dict], threshold: float = MATCH_THRESHOLD, products: catalog.Catalog | None = None):
+        self._threshold = threshold
+        self._exact: dict[str, str] = {}
+        self._entries: list[_Entry] = []
+        for item in items:
+            answer = item.get("answer")
+            if not answer:
+                continue
+            stale = stale_product(answer, products) if products is not None else None
+            if stale is not None:
+                log.warning("Dropped FAQ %r: its price for %s no longer matches the catalog", item.get("question"), stale)
+                continue
+            for question in [item.get("question"), *item.get("aliases", [])]:
+                if not question:
+                    continue
+                key = normalize(question)
+                self._exact[key] = answer
+                self._entries.append(_Entry(key, frozenset(tokenize(question)), answer))
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @classmethod
+    def from_files(cls, files: Mapping[str, str], products: catalog.Catalog | None = None) -> "FAQCache":
+        content = files.get(FAQ_FILE)
+        if content is None:
+            return cls([])
+        try:
+            items = json.loads(content)
+        except ValueError as e:
+            log.warning("Skipped %s: %s", FAQ_FILE, e)
+            return cls([])
+        return cls([i for i in items if isinstance(i, dict)], products=products)
+
+    def _score(self, key: str, tokens: frozenset, entry: _Entry) -> float:
+        if not entry.tokens:
+            return 0.0
+        if tokens <= entry.tokens:
+            # share of the question the utterance covers
+            return len(tokens) / len(entry.tokens)
+        # a misspelt word replaces a token rather than adding one
+        if len(tokens - entry.tokens) != len(entry.tokens - tokens):
+            return 0.0
+        ratio = SequenceMatcher(None, key, entry.question).ratio()
+        return ratio if ratio >= CHAR_MATCH_RATIO else 0.0
+
+    def match(self, utterance: str, record: bool = True) -> tuple[str, float] | None:
+        """Return (answer, score) for a confident match, else None; record=False skips hit/miss counts."""
+        key = normalize(utterance)
+        if not key:
+            return None
+        answer = self._exact.get(key)
+        if answer is not None:
+            self.hits += record
+            return answer, 1.0
+        tokens = frozenset(tokenize(utterance))
+        best, best_score = None, 0.0
+        for entry in self._entries:
+            score = self._score(key, tokens, entry)
+            if score > best_score:
+                best, best_score = entry, score
+        if best is not None and best_score >= self._threshold:
+            self.hits += record
+            return best.answer, best_score
+        self.misses += record
+        return None
+
+
+_faq: FAQCache | None = None
+_faq_version = -1
+_faq_lock = threading.Lock()
+
+
+def get_faq(snapshot) -> FAQCache:
+    """FAQ cache for a context snapshot, rebuilt only when the snapshot version changes."""
+    global _faq, _faq_version
+    with _faq_lock:
+        if _faq is None or _faq_version != snapshot.version:
+            _faq = FAQCache.from_files(snapshot.files, catalog.get_catalog(snapshot))
+            _faq_version = snapshot.version
+            log.info("FAQ: %d question(s) from context v%d", len(_faq), snapshot.version)
+        return _faq
@@ -0,0 +1,176 @@
+# handoff.py
+"""
+Graceful drain and in-flight session handoff across worker shutdowns.
+
+On SIGTERM livekit stops offering jobs to the worker and waits up to
+drain_timeout (WORKER_DRAIN_TIMEOUT) for the running ones. Job processes
+ignore the signal, so the worker process publishes the drain deadline as a
+marker file in the admission directory (see admission.lag_dir), checked from
+load_fnc; every session watches for it. Calls that end before the deadline
+simply finish. A call still going HANDOFF_MARGIN_SECS before the deadline
+saves its conversation (messages and the rolling summary) under
+SESSION_STATE_DIR (default $XDG_STATE_HOME/sales-agent/session_state), asks
+LiveKit to dispatch a fresh agent to the room and shuts down. A draining worker is never offered that job, so a replacement picks it
+up, claims the saved state by room name and carries on with context intact.
+
+Dispatching into a running room needs explicit dispatch, i.e. AGENT_NAME set
+on every worker. SESSION_STATE_DIR must be shared between workers (a volume or
+network mount) when replacements run on other hosts.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import admission
+import metrics
+
+log = logging.getLogger("handoff")
+
+DRAIN_TIMEOUT = int(os.getenv("WORKER_DRAIN_TIMEOUT", "600"))
+HANDOFF_MARGIN = float(os.getenv("HANDOFF_MARGIN_SECS", "15"))
+# per-host data the worker keeps between runs (also event_store's default); outside the server's web root
+STATE_HOME = Path(os.getenv("XDG_STATE_HOME") or Path.home() / ".local" / "state") / "sales-agent"
+STATE_DIR = Path(os.getenv("SESSION_STATE_DIR") or STATE_HOME / "session_state")
+# saved state older than this is from a call that has moved on
+STATE_TTL = float(os.getenv("SESSION_STATE_TTL", "300"))
+AGENT_NAME = os.getenv("AGENT_NAME", "")
+POLL_INTERVAL = 1.0
+
+_MARKER = "draining"
+
+
+# --- worker side ---
+_marked = False
+
+
+def watch_worker(worker) -> None:
+    """Call from load_fnc: publishes the drain deadline once the worker starts draining."""
+    global _marked
+    if _marked or not getattr(worker, "draining", False):
+        return
+    _marked = True
+    deadline = time.time() + DRAIN_TIMEOUT
+    try:
+        (admission.lag_dir() / _MARKER).write_text(f"{deadline:.3f}")
+    except OSError as e:
+        log.error("Could not publish the drain deadline: %s", e)
+        return
+    metrics.registry.inc("drains")
+    log.info("🚰 Draining: no new jobs, %d active session(s) have %ds to finish", len(worker.active_jobs), DRAIN_TIMEOUT)
+
+
+def drain_deadline() -> float | None:
+    """Wall-clock time by which sessions must be gone, or None if the worker is not draining."""
+    try:
+        return float((admission.lag_dir() / _MARKER).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+# --- session state ---
+def _state_path(room: str) -> Path:
+    return STATE_DIR / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', room)}.json"
+
+
+def save_state(room: str, state: dict[str, Any]) -> Path:
+    path = _state_path(room)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({**state, "room": room, "saved_at": time.time()}))
+    os.replace(tmp, path)  # readers never see a partial file
+    return path
+
+
+def claim_state(room: str) -> dict[str, Any] | None:
+    """Take the saved state for a room, if any; only one job can claim it."""
+    path = _state_path(room)
+    claimed = path.with_name(f".{path.name}.{os.getpid()}.claimed")
+    try:
+        os.replace(path, claimed)
+    except FileNotFoundError:
+        return None
+    try:
+        state = json.loads(claimed.read_text())
+    except (OSError, ValueError) as e:
+        log.warning("Unreadable session state for %s: %s", room, e)
+        return None
+    finally:
+        claimed.unlink(missing_ok=True)
+    age = time.time() - state.get("saved_at", 0)
+    if age > STATE_TTL:
+        log.info("Ignoring session state for %s saved %.0fs ago", room, age)
+        return None
+    return state
+
+
+# --- job side ---
+class SessionHandoff:
+    """Hands a live call to a replacement worker when this one drains."""
+
+    def __init__(self, ctx, export_state: Callable[[], dict[str, Any]]):
+        self._ctx = ctx
+        self._export_state = export_state
+        self._task: asyncio.Task | None = None
+        self.handed_off = False
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._watch())
+        self._ctx.add_shutdown_callback(self._on_shutdown)
+
+    async def _watch(self) -> None:
+        while (deadline := drain_deadline()) is None:
+            await asyncio.sleep(POLL_INTERVAL)
+        remaining = deadline - HANDOFF_MARGIN - time.time()
+        log.info("Worker draining; handing off in %.0fs unless the call ends first", max(0.0, remaining))
+        await asyncio.sleep(max(0.0, remaining))
+        await self.hand_off()
+        self._ctx.shutdown(reason="drain handoff")
+
+    async def _on_shutdown(self, reason: str) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        # the drain timed out before the watcher fired, or the job was stopped mid-drain
+        if drain_deadline() is not None:
+            await self.hand_off()
+
+    def _caller_present(self) -> bool:
+        try:
+            return bool(self._ctx.room.remote_participants)
+        except Exception:
+            return False
+
+    async def hand_off(self) -> bool:
+        """Save the conversation and dispatch a replacement agent; False if there is no call to hand off."""
+        if self.handed_off or not self._caller_present():
+            return False
+        self.handed_off = True
+        room, job_id = self._ctx.room.name, self._ctx.job.id
+        try:
+            state = self._export_state()
+            await asyncio.to_thread(save_state, room, {**state, "job_id": job_id})
+        except Exception as e:
+            log.error("Could not save session state for %s: %s", room, e)
+            return False
+        if not AGENT_NAME:
+            log.warning("AGENT_NAME is not set; state for %s saved but no replacement dispatched", room)
+            return False
+        from livekit import api
+
+        try:
+            await self._ctx.api.agent_dispatch.create_dispatch(
+                api.CreateAgentDispatchRequest(
+                    agent_name=AGENT_NAME, room=room, metadata=json.dumps({"handoff_from": job_id})
+                )
+            )
+        except Exception as e:
+            log.error("Could not dispatch a replacement agent to %s: %s", room, e)
+            return False
+        metrics.registry.inc("handoffs")
+        log.info("🤝 Handed off %s (%d message(s)) to a replacement worker", room, len(state.get("messages", [])))
+        return True
@@ -0,0 +1,204 @@
+# llm_router.py
+"""
+Hedged, failover LLM requests across several OpenAI-compatible backends.
+
+The first healthy backend gets the request. If it has not produced a first
+chunk within LLM_HEDGE_DELAY_MS, the next backend is asked too, and whichever
+streams first wins while the other is cancelled. A backend that errors before
+its first chunk is failed over immediately. Each backend has a circuit breaker
+that opens after LLM_BREAKER_FAILURES consecutive failures and lets a single
+trial request through after LLM_BREAKER_COOLDOWN seconds.
+
+Backends come from LLM_BACKENDS, a JSON list such as
+[{"name": "cerebras", "base_url": "https://api.cerebras.ai/v1",
+  "model": "llama-3.3-70b", "api_key_env": "CEREBRAS_API_KEY"}, ...]
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import AsyncIterable, AsyncIterator, Callable
+
+import metrics
+
+log = logging.getLogger("llm_router")
+
+HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY_MS", "400")) / 1000
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self._threshold = failures
+        self._cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial: object | None = None  # the attempt probing a half-open backend
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self._cooldown else "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half_open" and self._trial is None)
+
+    def on_attempt(self, attempt: object) -> None:
+        if self.state == "half_open" and self._trial is None:
+            self._trial = attempt  # one request probes the backend
+
+    def release(self, attempt: object) -> None:
+        """An attempt ended with no outcome (cancelled after losing a hedge race); the next one may probe."""
+        if self._trial is attempt:
+            self._trial = None
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial = None
+        if self.failures >= self._threshold:
+            self.opened_at = time.monotonic()
+
+
+class Backend:
+    def __init__(self, name: str, llm, breaker: CircuitBreaker | None = None):
+        self.name = name
+        self.llm = llm
+        self.breaker = breaker or CircuitBreaker()
+
+
+class _Attempt:
+    def __init__(self, backend: Backend, open_stream: Callable[[Backend], AsyncIterable]):
+        self.backend = backend
+        backend.breaker.on_attempt(self)
+        self.iterator = open_stream(backend).__aiter__()
+        self.first = asyncio.ensure_future(self.iterator.__anext__())
+
+    async def close(self) -> None:
+        self.backend.breaker.release(self)
+        self.first.cancel()
+        await asyncio.gather(self.first, return_exceptions=True)
+        aclose = getattr(self.iterator, "aclose", None)
+        if aclose is not None:
+            try:
+                await aclose()
+            except Exception:
+                pass
+
+
+class HedgedRouter:
+    def __init__(self, backends: list[Backend], hedge_delay: float = HEDGE_DELAY):
+        if not backends:
+            raise ValueError("HedgedRouter needs at least one backend")
+        self.backends = backends
+        self._hedge_delay = hedge_delay
+
+    def _candidates(self) -> list[Backend]:
+        allowed = [b for b in self.backends if b.breaker.allow()]
+        # every breaker open: still try the primary rather than fail the turn outright
+        return allowed or self.backends[:1]
+
+    async def stream(self, open_stream: Callable[[Backend], AsyncIterable]) -> AsyncIterator:
+        """Race backends for the first chunk, then follow the winner to the end."""
+        pending = self._candidates()
+        running: list[_Attempt] = []
+        winner, first = None, None
+        last_error: BaseException | None = None
+        try:
+            while winner is None:
+                if not running:
+                    if not pending:
+                        raise last_error or RuntimeError("no LLM backend available")
+                    running.append(_Attempt(pending.pop(0), open_stream))
+                timeout = self._hedge_delay if pending else None
+                done, _ = await asyncio.wait([a.first for a in running], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    b = pending.pop(0)
+                    log.info("⏱️ Hedging LLM request to %s", b.name)
+                    metrics.registry.inc("llm_hedges")
+                    running.append(_Attempt(b, open_stream))
+                    continue
+                for attempt in [a for a in running if a.first in done]:
+                    try:
+                        first = attempt.first.result()
+                    except StopAsyncIteration:
+                        first = None  # empty reply still counts as an answer
+                    except Exception as e:
+                        last_error = e
+                        attempt.backend.breaker.record_failure()
+                        metrics.registry.inc("llm_backend_errors")
+                        log.warning("LLM backend %s failed: %s", attempt.backend.name, e)
+                        running.remove(attempt)
+                        if pending:
+                            metrics.registry.inc("llm_failovers")
+                        continue
+                    winner = attempt
+                    break
+        finally:
+            for attempt in running:
+                if attempt is not winner:
+                    await attempt.close()
+
+        try:
+            if first is not None:
+                yield first
+                async for chunk in winner.iterator:
+                    yield chunk
+        except Exception:
+            # output already reached the caller, so no transparent failover here
+            winner.backend.breaker.record_failure()
+            metrics.registry.inc("llm_backend_errors")
+            raise
+        else:
+            winner.backend.breaker.record_success()
+        finally:
+            await winner.close()
+
+    def chat(self, chat_ctx, tools, model_settings) -> AsyncIterator:
+        """Hedged equivalent of Agent.default.llm_node for livekit LLM plugins."""
+        from livekit.agents import APIConnectOptions
+
+        # the router does its own failover, so the plugin must not retry
+        conn_options = APIConnectOptions(max_retry=0)
+
+        async def open_stream(backend: Backend):
+            async with backend.llm.chat(
+                chat_ctx=chat_ctx,
+                tools=tools,
+                tool_choice=model_settings.tool_choice,
+                conn_options=conn_options,
+            ) as stream:
+                async for chunk in stream:
+                    yield chunk
+
+        return self.stream(open_stream)
+
+
+def backends_from_env(http_client=None) -> list[Backend]:
+    """Build backends from LLM_BACKENDS; an empty list means no routing."""
+    raw = os.getenv("LLM_BACKENDS")
+    if not raw:
+        return []
+    import openai as openai_sdk
+    from livekit.plugins import openai
+
+    backends = []
+    for spec in json.loads(raw):
+        client = openai_sdk.AsyncClient(
+            api_key=os.getenv(spec.get("api_key_env", ""), spec.get("api_key", "unused")),
+            base_url=spec["base_url"],
+            max_retries=0,
+            http_client=http_client,
+        )
+        backends.append(Backend(spec.get("name", spec["base_url"]), openai.LLM(model=spec["model"], client=client)))
+    log.info("LLM backends: %s", ", ".join(b.name for b in backends))
+    return backends
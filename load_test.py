@@ -0,0 +1,175 @@
+# load_test.py
+"""
+Load test for the token server: requests per second and latency percentiles.
+
+Opens --concurrency keep-alive connections and has each send requests back to
+back for --duration seconds (or until --requests in total), over raw asyncio
+streams so the client costs as little CPU as possible. With --slow-clients,
+that many extra connections download --slow-path at --slow-rate bytes/s the
+whole time, the way a phone on a bad network pulls livekit-client.umd.js;
+token latency should not move.
+
+Every connection comes from one address, so against the default rate limits
+(ratelimit.py) nearly all /token requests are answered 429 after the first
+few. Latency is reported for 2xx responses on their own, with the 429s
+counted separately; to benchmark token serving itself, start the server with
+the per-IP and global buckets raised out of the way.
+
+Usage:
+  TOKEN_RATE_PER_IP=1e9 TOKEN_BURST_PER_IP=1e9 TOKEN_RATE_GLOBAL=1e9 TOKEN_BURST_GLOBAL=1e9 python server.py &
+  python load_test.py --concurrency 500 --duration 10
+  python load_test.py --slow-clients 20 --path /token
+"""
+
+import argparse
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def read_response(reader: asyncio.StreamReader) -> tuple[int, bool]:
+    """Read one response; returns (status, server keeps the connection open)."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(headers.get("content-length", "0")))
+    return status, headers.get("connection", "").lower() != "close"
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: list[float] = []  # 2xx responses only
+        self.limited: list[float] = []  # 429s
+        self.statuses: dict[int, int] = {}
+        self.errors = 0
+        self.connects = 0
+
+
+async def client(host: str, port: int, path: str, stop_at: float, budget: list[int], stats: Stats) -> None:
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode()
+    reader = writer = None
+    while time.perf_counter() < stop_at and budget[0] > 0:
+        budget[0] -= 1
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+                stats.connects += 1
+            started = time.perf_counter()
+            writer.write(request)
+            status, keep = await read_response(reader)
+            elapsed = time.perf_counter() - started
+            if 200 <= status < 300:
+                stats.latencies.append(elapsed)
+            elif status == 429:
+                stats.limited.append(elapsed)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            if not keep:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            stats.errors += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.01)
+    if writer is not None:
+        writer.close()
+
+
+async def slow_client(host: str, port: int, path: str, rate: int, stop_at: float) -> int:
+    """Download `path` over and over at `rate` bytes/s; returns bytes read."""
+    total = 0
+    reader, writer = await asyncio.open_connection(host, port, limit=2**20)
+    # a small receive buffer makes the server feel the slow reader, as on a real network
+    sock = writer.get_extra_info("socket")
+    if sock is not None:
+        import socket
+
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    chunk = max(1, rate // 10)
+    try:
+        while time.perf_counter() < stop_at:
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = next(
+                int(line.split(":", 1)[1]) for line in head.decode("latin-1").split("\r\n")
+                if line.lower().startswith("content-length:")
+            )
+            while length and time.perf_counter() < stop_at:
+                data = await reader.read(min(chunk, length))
+                if not data:
+                    return total
+                length -= len(data)
+                total += len(data)
+                await asyncio.sleep(0.1)
+            if length:
+                break
+    except (OSError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+    return total
+
+
+async def run(args) -> None:
+    url = urlsplit(args.url)
+    host, port = url.hostname or "127.0.0.1", url.port or 80
+    stats = Stats()
+    budget = [args.requests or 2**62]
+    started = time.perf_counter()
+    stop_at = started + args.duration
+    slow = [
+        asyncio.create_task(slow_client(host, port, args.slow_path, args.slow_rate, stop_at))
+        for _ in range(args.slow_clients)
+    ]
+    await asyncio.sleep(0.2 if slow else 0)  # let the slow downloads get going first
+    await asyncio.gather(*(client(host, port, args.path, stop_at, budget, stats) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    slow_bytes = sum(await asyncio.gather(*slow))
+
+    lat = sorted(stats.latencies)
+    total = sum(stats.statuses.values())
+    ms = lambda v: f"{v * 1000:.1f} ms"  # noqa: E731
+    print(f"{total} requests to {args.path} in {elapsed:.1f}s over {args.concurrency} connections "
+          f"({stats.connects} opened)")
+    print(f"  {total / elapsed:,.0f} req/s, statuses {dict(sorted(stats.statuses.items()))}, {stats.errors} errors")
+    if lat:
+        print(f"  2xx: {len(lat) / elapsed:,.0f} req/s, latency p50 {ms(percentile(lat, 0.50))}  "
+              f"p95 {ms(percentile(lat, 0.95))}  p99 {ms(percentile(lat, 0.99))}  max {ms(lat[-1])}")
+    if stats.limited:
+        limited = sorted(stats.limited)
+        print(f"  429: {len(limited)} rate limited ({len(limited) / total:.0%}), latency p50 "
+              f"{ms(percentile(limited, 0.50))}  p99 {ms(percentile(limited, 0.99))}")
+        if len(limited) > len(lat):
+            print("  mostly rate limited: raise TOKEN_RATE_PER_IP / TOKEN_BURST_PER_IP (and the global bucket) "
+                  "on the server to benchmark token serving")
+    if args.slow_clients:
+        print(f"  {args.slow_clients} slow client(s) read {slow_bytes / 1024:.0f} KiB of {args.slow_path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="server base URL")
+    parser.add_argument("--path", default="/token")
+    parser.add_argument("--concurrency", type=int, default=200, help="keep-alive connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0: no limit)")
+    parser.add_argument("--slow-clients", type=int, default=0)
+    parser.add_argument("--slow-path", default="/node_modules/livekit-client/dist/livekit-client.umd.js")
+    parser.add_argument("--slow-rate", type=int, default=20_000, help="bytes/s per slow client")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# memory.py
+"""
+Token-budgeted conversation history with a rolling summary.
+
+The system prompt and the last HISTORY_KEEP_TURNS turns are always sent
+verbatim. Older turns are folded into a running summary that an LLM writes in
+a background task, so summarization never sits on the reply path: until the
+summary catches up, the not-yet-summarized turns are still sent as they are.
+If the prompt is still over HISTORY_TOKEN_BUDGET, the oldest verbatim turns
+beyond the kept ones are dropped.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Sequence, TypeVar
+
+log = logging.getLogger("memory")
+
+TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))
+KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "6"))
+
+SUMMARY_PROMPT = (
+    "You keep notes for a sales agent on a phone call. Update the running summary with the new "
+    "exchanges. Keep the customer's needs, budget, products discussed, prices quoted, objections "
+    "and any commitments. Plain sentences, at most 120 words."
+)
+
+T = TypeVar("T")
+Summarizer = Callable[[str, str], Awaitable[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English; good enough for budgeting
+    return (len(text) + 3) // 4
+
+
+class ConversationMemory:
+    def __init__(
+        self,
+        summarize: Summarizer | None,
+        budget_tokens: int = TOKEN_BUDGET,
+        keep_turns: int = KEEP_TURNS,
+    ):
+        self._summarize = summarize
+        self._budget = budget_tokens
+        self._keep = max(1, keep_turns)
+        self.summary = ""
+        self._covered = 0  # number of leading turns folded into the summary
+        self._task: asyncio.Task | None = None
+
+    def select(
+        self,
+        turns: Sequence[Sequence[T]],
+        render: Callable[[T], str],
+        reserved_tokens: int = 0,
+    ) -> tuple[str, list[Sequence[T]], int]:
+        """Return (summary, turns to send verbatim, estimated prompt tokens).
+
+        `turns` is the whole history split into turns, oldest first; `render`
+        turns one item into "role: text". `reserved_tokens` covers the system
+        prompt and anything else sent alongside the history.
+        """
+        if len(turns) < self._covered:  # history was reset
+            self.summary, self._covered = "", 0
+
+        foldable = len(turns) - self._keep
+        if foldable > self._covered and self._summarize is not None and (self._task is None or self._task.done()):
+            transcript = "\n".join(render(item) for turn in turns[self._covered:foldable] for item in turn)
+            self._task = asyncio.create_task(self._fold(transcript, foldable))
+
+        verbatim = list(turns[self._covered:])
+        sizes = [sum(estimate_tokens(render(item)) for item in turn) for turn in verbatim]
+        total = reserved_tokens + estimate_tokens(self.summary) + sum(sizes)
+        while total > self._budget and len(verbatim) > self._keep:
+            verbatim.pop(0)
+            total -= sizes.pop(0)
+        return self.summary, verbatim, total
+
+    async def _fold(self, transcript: str, upto: int) -> None:
+        try:
+            summary = await self._summarize(self.summary, transcript)
+        except Exception as e:
+            log.warning("Summarization failed: %s", e)
+            return
+        if summary:
+            self.summary, self._covered = summary, upto
+            log.info("History summarized through turn %d (%d tokens)", upto, estimate_tokens(summary))
+
+    def export(self) -> dict:
+        """Summary state to carry over to another worker (see handoff)."""
+        return {"summary": self.summary, "covered": self._covered}
+
+    def restore(self, summary: str, covered: int) -> None:
+        self.summary, self._covered = summary, covered
+
+    async def aclose(self) -> None:
+        """Cancel a summary in progress and wait for it, so it does not outlive the session's loop."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+def llm_summarizer(model) -> Summarizer:
+    """Summarizer backed by a livekit LLM plugin (e.g. openai.LLM.with_cerebras)."""
+    from livekit.agents import llm
+
+    async def summarize(previous: str, transcript: str) -> str:
+        chat_ctx = llm.ChatContext()
+        chat_ctx.add_message(role="system", content=SUMMARY_PROMPT)
+        chat_ctx.add_message(
+            role="user",
+            content=f"Summary so far:\n{previous or '(none)'}\n\nNew exchanges:\n{transcript}",
+        )
+        text = ""
+        async with model.chat(chat_ctx=chat_ctx) as stream:
+            async for chunk in stream:
+                if chunk.delta and chunk.delta.content:
+                    text += chunk.delta.content
+        return text.strip()
+
+    return summarize
@@ -0,0 +1,399 @@
+# metrics.py
+"""
+Per-turn latency instrumentation for the voice pipeline.
+
+Each session owns a TurnTracker that timestamps the stages of a turn (end of
+user speech, final transcript, turn committed, LLM first token, TTS first
+audio). Completed turns are logged as one JSON line and folded into
+histograms, which are served as Prometheus text on /metrics and as
+p50/p95/p99 summaries on /metrics.json (METRICS_PORT, 0 disables).
+
+The worker's main process serves the endpoint for the whole worker. Job
+processes write a snapshot of their registry every EXPORT_INTERVAL to a
+directory shared through the environment, and each scrape merges them:
+counters and histograms are summed, gauges are summed over the processes that
+are still reporting. The last snapshot of a process that has exited is folded
+into running totals in the serving process and its file removed, so a scrape
+only reads the live jobs. The directory is removed when the worker exits.
+"""
+
+import asyncio
+import atexit
+import bisect
+import json
+import logging
+import multiprocessing.util
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable
+
+log = logging.getLogger("metrics")
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+EXPORT_INTERVAL = 1.0
+# gauges of a process that has not exported for this long are dropped; its counts are kept
+STALE_SECS = 5.0
+
+_DIR_ENV = "SALES_AGENT_METRICS_DIR"
+
+# seconds; roughly log-spaced from 5 ms to 30 s
+BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.75,
+    1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 30.0,
+)
+
+class Histogram:
+    def __init__(self, buckets: tuple = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate a quantile by linear interpolation inside its bucket."""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = q * self.count
+            seen = 0
+            for i, n in enumerate(self.counts):
+                if seen + n >= rank and n:
+                    lo = self.buckets[i - 1] if i else 0.0
+                    hi = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                    return lo + (hi - lo) * (rank - seen) / n
+                seen += n
+            return self.buckets[-1]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"counts": list(self.counts), "count": self.count, "sum": self.sum}
+
+    def merge(self, data: dict) -> None:
+        with self._lock:
+            for i, n in enumerate(data["counts"]):
+                self.counts[i] += n
+            self.count += data["count"]
+            self.sum += data["sum"]
+
+
+class Registry:
+    """Named histograms and counters shared by every session in the process."""
+
+    def __init__(self):
+        self.histograms: dict[str, Histogram] = {}
+        self.counters: dict[str, float] = {}
+        self.gauges: dict[str, Callable[[], float]] = {}
+        self.derived: dict[str, Callable[[dict], float]] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str) -> Histogram:
+        with self._lock:
+            h = self.histograms.get(name)
+            if h is None:
+                h = self.histograms[name] = Histogram()
+            return h
+
+    def inc(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name: str, fn: Callable[[], float]) -> None:
+        """Register a callable sampled at scrape time."""
+        self.gauges[name] = fn
+
+    def derive(self, name: str, fn: Callable[[dict], float]) -> None:
+        """Register a gauge computed from the counters, evaluated after merging processes."""
+        self.derived[name] = fn
+
+    def _gauge_values(self) -> dict[str, float]:
+        values = {name: fn() for name, fn in list(self.gauges.items())}
+        values.update((name, fn(self.counters)) for name, fn in list(self.derived.items()))
+        return values
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "pid": os.getpid(),
+            "updated": time.time(),
+            "counters": counters,
+            "histograms": {name: h.snapshot() for name, h in list(self.histograms.items())},
+            "gauges": {name: fn() for name, fn in list(self.gauges.items())},
+        }
+
+    def merge(self, snapshot: dict) -> None:
+        """Add another process's counters and histograms (gauges are merged by collect)."""
+        for name, value in snapshot["counters"].items():
+            self.inc(name, value)
+        for name, data in snapshot["histograms"].items():
+            self.histogram(name).merge(data)
+
+    def summary(self) -> dict:
+        out = {}
+        for name, h in list(self.histograms.items()):
+            out[name] = {
+                "count": h.count,
+                "p50": h.quantile(0.50),
+                "p95": h.quantile(0.95),
+                "p99": h.quantile(0.99),
+            }
+        out["counters"] = dict(self.counters)
+        out["gauges"] = self._gauge_values()
+        return out
+
+    def prometheus(self) -> str:
+        lines = []
+        for name, h in list(self.histograms.items()):
+            metric = f"sales_agent_{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for le, n in zip(h.buckets, h.counts):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{le="{le}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {h.count}')
+            lines.append(f"{metric}_sum {h.sum:.6f}")
+            lines.append(f"{metric}_count {h.count}")
+        for name, value in list(self.counters.items()):
+            lines.append(f"# TYPE sales_agent_{name}_total counter")
+            lines.append(f"sales_agent_{name}_total {value}")
+        for name, value in self._gauge_values().items():
+            lines.append(f"# TYPE sales_agent_{name} gauge")
+            lines.append(f"sales_agent_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# --- aggregation across the worker's processes ---
+def shared_dir(create: bool = False) -> Path | None:
+    """Directory job processes export snapshots into; created by the main process and inherited."""
+    path = os.environ.get(_DIR_ENV)
+    if not path and create:
+        path = os.environ[_DIR_ENV] = tempfile.mkdtemp(prefix="sales-agent-metrics-")
+        atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return Path(path) if path else None
+
+
+# counters and histograms of job processes that have exited
+_exited = Registry()
+_exited_lock = threading.Lock()
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read_snapshots(directory: Path) -> list[dict]:
+    """Snapshots of the running job processes; those of exited ones are folded into _exited and removed."""
+    snapshots = []
+    now = time.time()
+    with _exited_lock:
+        for entry in directory.glob("*.json"):
+            try:
+                snapshot = json.loads(entry.read_text())
+            except (OSError, ValueError):
+                continue  # replaced or removed mid-read
+            # a process killed before its final export is recognized once it stops reporting
+            if snapshot.get("final") or (now - snapshot["updated"] > STALE_SECS and not _alive(snapshot["pid"])):
+                _exited.merge(snapshot)
+                entry.unlink(missing_ok=True)
+            else:
+                snapshots.append(snapshot)
+        snapshots.append(_exited.snapshot())
+    return snapshots
+
+
+def collect() -> Registry:
+    """This process's metrics plus the latest snapshots of the worker's other processes."""
+    directory = shared_dir()
+    if directory is None:
+        return registry
+    merged = Registry()
+    merged.derived = registry.derived
+    gauges: dict[str, float] = {}
+    now = time.time()
+    for snapshot in [registry.snapshot(), *_read_snapshots(directory)]:
+        merged.merge(snapshot)
+        if now - snapshot["updated"] <= STALE_SECS:
+            for name, value in snapshot["gauges"].items():
+                gauges[name] = gauges.get(name, 0) + value
+    for name, value in gauges.items():
+        merged.gauge(name, lambda value=value: value)
+    return merged
+
+
+_exporter: threading.Thread | None = None
+_exporter_lock = threading.Lock()
+_exported_final = False
+
+
+def _write_snapshot(path: Path, final: bool = False) -> None:
+    global _exported_final
+    with _exporter_lock:
+        if _exported_final:
+            return  # the serving process may already have folded it in and removed the file
+        _exported_final = final
+        tmp = path.with_suffix(".tmp")
+        try:
+            tmp.write_text(json.dumps({**registry.snapshot(), "final": final}))
+            os.replace(tmp, path)
+        except OSError as e:
+            log.debug("Metrics export to %s failed: %s", path, e)
+
+
+def _export(path: Path) -> None:
+    while True:
+        time.sleep(EXPORT_INTERVAL)
+        _write_snapshot(path)
+
+
+def start_exporter() -> None:
+    """In a job process: publish this process's metrics to the worker's endpoint."""
+    global _exporter
+    directory = shared_dir()
+    with _exporter_lock:
+        if _exporter is not None or _server_thread is not None or directory is None:
+            return  # the serving process is read live
+        # not just the pid: a reused pid must not overwrite an exited process's totals
+        path = directory / f"{os.getpid()}-{uuid.uuid4().hex[:12]}.json"
+        _exporter = threading.Thread(target=_export, args=(path,), daemon=True, name="metrics_export")
+        _exporter.start()
+    atexit.register(_write_snapshot, path, True)
+    # multiprocessing children leave through os._exit, which skips atexit but runs these finalizers
+    multiprocessing.util.Finalize(None, _write_snapshot, args=(path, True), exitpriority=10)
+
+
+class TurnTracker:
+    """Stage timestamps for the current turn of one session."""
+
+    def __init__(self, room: str = "", session_id: str = "", sink: Callable[[dict], object] | None = None):
+        self.room = room
+        self.session_id = session_id
+        self._sink = sink  # also gets each finished turn's record, e.g. event_store.CallRecorder.turn
+        self.turn = 0
+        self._marks: dict[str, float] = {}
+        self._flags: dict[str, object] = {}
+
+    def mark(self, stage: str, at: float | None = None, first: bool = False) -> None:
+        """Record `stage` now (or at `at`); with first=True keep the earliest mark."""
+        if first and stage in self._marks:
+            return
+        self._marks[stage] = time.perf_counter() if at is None else at
+
+    def flag(self, name: str, value: object = True) -> None:
+        self._flags[name] = value
+
+    def _span(self, start: str, end: str) -> float | None:
+        if start in self._marks and end in self._marks:
+            return max(0.0, self._marks[end] - self._marks[start])
+        return None
+
+    def finish(self) -> dict | None:
+        """Close the turn at first audio: observe histograms and emit a log line."""
+        if "tts_first_audio" not in self._marks:
+            return None
+        self.turn += 1
+        e2e = self._span("speech_end", "tts_first_audio")
+        if e2e is None:
+            e2e = self._span("turn_committed", "tts_first_audio")
+        stages = {
+            "endpointing": self._span("speech_end", "turn_committed"),
+            "stt_final": self._span("speech_end", "stt_final"),
+            "llm_ttft": self._span("llm_start", "llm_first_token"),
+            "tts_ttfb": self._span("tts_start", "tts_first_audio"),
+            "e2e": e2e,
+        }
+        for name, value in stages.items():
+            if value is not None:
+                registry.histogram(name).observe(value)
+        registry.inc("turns")
+        record = {
+            "event": "turn",
+            "room": self.room,
+            "session_id": self.session_id,
+            "turn": self.turn,
+            **{f"{k}_ms": round(v * 1000, 1) for k, v in stages.items() if v is not None},
+            **self._flags,
+        }
+        log.info(json.dumps(record))
+        if self._sink is not None:
+            self._sink(record)
+        self._marks.clear()
+        self._flags.clear()
+        return record
+
+
+# --- local metrics endpoint ---
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.decode("latin-1").split()
+        path = parts[1] if len(parts) > 1 else "/"
+        if path == "/metrics":
+            status, ctype, body = "200 OK", "text/plain; version=0.0.4", collect().prometheus()
+        elif path == "/metrics.json":
+            status, ctype, body = "200 OK", "application/json", json.dumps(collect().summary())
+        else:
+            status, ctype, body = "404 Not Found", "text/plain", "not found\n"
+        data = body.encode()
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\nContent-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + data
+        )
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+_server_thread: threading.Thread | None = None
+_server_lock = threading.Lock()
+
+
+def _serve(host: str, port: int) -> None:
+    loop = asyncio.new_event_loop()
+    try:
+        server = loop.run_until_complete(asyncio.start_server(_handle, host, port))
+    except OSError as e:
+        log.warning("Metrics endpoint not started on %s:%d: %s", host, port, e)
+        loop.close()
+        return
+    log.info("📈 Metrics on http://%s:%d/metrics", host, port)
+    loop.run_until_complete(server.serve_forever())
+
+
+def start_server(host: str = METRICS_HOST, port: int = METRICS_PORT) -> None:
+    """Serve /metrics for the whole worker; call in the main process before job processes start.
+
+    The server gets a thread and loop of its own, apart from the worker's.
+    """
+    global _server_thread
+    with _server_lock:
+        if _server_thread is not None or not port:
+            return
+        shared_dir(create=True)  # inherited by the job processes, which export into it
+        _server_thread = threading.Thread(target=_serve, args=(host, port), daemon=True, name="metrics_server")
+        _server_thread.start()
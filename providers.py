@@ -0,0 +1,254 @@
+# providers.py
+"""
+STT/TTS/LLM clients for a job, opened before the call needs them.
+
+Creating the plugins lazily means the caller waits on fresh TLS handshakes
+before the first word. The entrypoint leases a provider set before it loads
+context or connects to the room, and leasing builds the clients and prewarms
+them, so the Cartesia websocket and LLM connections are set up while the rest
+of the job starts. The set is backed by keep-alive HTTP connection pools and
+closed when the last session on its event loop releases it.
+
+Connections are bound to the event loop that opened them, and livekit runs
+every job on its own loop: one job per process under the default process
+executor, a loop per job in thread mode. So a provider set serves a single
+session and is not shared across calls. In thread mode
+(WORKER_EXECUTOR=thread) the LLM clients of every loop do send through one
+connection pool on a dedicated I/O loop (_SharedHTTP), so sessions of the
+process share its TLS connections. Cartesia's STT/TTS websockets stay per
+loop.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import weakref
+from typing import NamedTuple
+
+import aiohttp
+import httpx
+import openai as openai_sdk
+
+import llm_router
+
+log = logging.getLogger("providers")
+
+HTTP_POOL_CONNECTIONS = int(os.getenv("PROVIDER_HTTP_CONNECTIONS", "50"))
+IDLE_TIMEOUT = float(os.getenv("PROVIDER_IDLE_TIMEOUT", "300"))
+LLM_MODEL = os.getenv("CEREBRAS_MODEL", "llama-3.3-70b")
+TTS_VOICE = os.getenv("CARTESIA_VOICE")
+CEREBRAS_BASE_URL = "https://api.cerebras.ai/v1"
+# one LLM connection pool for all job loops of the process
+SHARE_LLM_HTTP = os.getenv("WORKER_EXECUTOR", "process").lower() == "thread"
+LLM_TIMEOUT = httpx.Timeout(connect=15.0, read=5.0, write=5.0, pool=5.0)
+
+
+def load_plugins():
+    """Import the Cartesia and OpenAI plugins on first use (main thread only, see sales_agent.load_plugins)."""
+    from livekit.plugins import cartesia, openai
+
+    return cartesia, openai
+
+
+class Providers(NamedTuple):
+    stt: "cartesia.STT"
+    tts: "cartesia.TTS"
+    llm: "openai.LLM"
+    # set when LLM_BACKENDS lists more than one backend
+    router: llm_router.HedgedRouter | None = None
+
+    def clients(self) -> list:
+        extra = [b.llm for b in self.router.backends if b.llm is not self.llm] if self.router else []
+        return [self.stt, self.tts, self.llm, *extra]
+
+
+class ProviderPool:
+    """The provider set of one event loop: built on the first lease, closed after the last release."""
+
+    def __init__(self, idle_timeout: float = IDLE_TIMEOUT):
+        self._idle_timeout = idle_timeout
+        self._providers: Providers | None = None
+        self._leases = 0
+        self._http: aiohttp.ClientSession | None = None
+        self._llm_http: httpx.AsyncClient | None = None
+
+    def _ensure_http(self) -> None:
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=HTTP_POOL_CONNECTIONS,
+                    keepalive_timeout=self._idle_timeout,
+                    enable_cleanup_closed=True,
+                )
+            )
+        if self._llm_http is None or self._llm_http.is_closed:
+            if SHARE_LLM_HTTP:
+                # a thin per-loop client; the connections belong to the shared I/O loop
+                self._llm_http = httpx.AsyncClient(
+                    timeout=LLM_TIMEOUT, follow_redirects=True, transport=_SharedTransport(get_shared_http()),
+                )
+            else:
+                self._llm_http = _llm_client(self._idle_timeout)
+
+    def _build(self) -> Providers:
+        self._ensure_http()
+        cartesia, openai = load_plugins()
+        backends = llm_router.backends_from_env(self._llm_http)
+        if backends:
+            primary = backends[0].llm
+        else:
+            client = openai_sdk.AsyncClient(
+                api_key=os.getenv("CEREBRAS_API_KEY"),
+                base_url=CEREBRAS_BASE_URL,
+                max_retries=0,
+                http_client=self._llm_http,
+            )
+            primary = openai.LLM.with_cerebras(model=LLM_MODEL, client=client)
+        providers = Providers(
+            stt=cartesia.STT(http_session=self._http),
+            tts=cartesia.TTS(http_session=self._http, **({"voice": TTS_VOICE} if TTS_VOICE else {})),
+            llm=primary,
+            router=llm_router.HedgedRouter(backends) if len(backends) > 1 else None,
+        )
+        # open the first websocket / TLS connections before a caller is waiting
+        for p in providers.clients():
+            try:
+                p.prewarm()
+            except Exception as e:
+                log.debug("prewarm %s failed: %s", type(p).__name__, e)
+        return providers
+
+    def acquire(self) -> Providers:
+        """Lease the provider set, building and prewarming it if needed; pair every call with release()."""
+        if self._providers is None:
+            self._providers = self._build()
+            log.info("Provider set created")
+        self._leases += 1
+        return self._providers
+
+    async def release(self, providers: Providers) -> None:
+        if providers is not self._providers:
+            return
+        self._leases -= 1
+        if self._leases == 0:
+            await self.aclose()
+
+    async def _close_http(self) -> None:
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+        if self._llm_http is not None:
+            await self._llm_http.aclose()
+            self._llm_http = None
+
+    async def aclose(self) -> None:
+        providers, self._providers = self._providers, None
+        self._leases = 0
+        if providers is not None:
+            await _close(providers)
+        await self._close_http()
+
+
+def _llm_client(idle_timeout: float) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=LLM_TIMEOUT,
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=HTTP_POOL_CONNECTIONS,
+            max_keepalive_connections=HTTP_POOL_CONNECTIONS,
+            keepalive_expiry=idle_timeout,
+        ),
+    )
+
+
+class _SharedHTTP:
+    """An httpx connection pool on an event loop of its own, used from any other loop."""
+
+    def __init__(self, idle_timeout: float = IDLE_TIMEOUT):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True, name="provider_http").start()
+        self.client = _llm_client(idle_timeout)
+
+    def run(self, coro) -> asyncio.Future:
+        """Run a coroutine on the I/O loop; awaitable from the caller's loop, and cancelled with it."""
+        return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    async def send(self, request: httpx.Request) -> httpx.Response:
+        # only ever awaited on the I/O loop
+        return await self.client.send(request, stream=True)
+
+
+_shared_http: _SharedHTTP | None = None
+_shared_http_lock = threading.Lock()
+
+
+def get_shared_http() -> _SharedHTTP:
+    global _shared_http
+    with _shared_http_lock:
+        if _shared_http is None:
+            _shared_http = _SharedHTTP()
+        return _shared_http
+
+
+async def _next_chunk(chunks) -> bytes | None:
+    try:
+        return await chunks.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+class _BridgedStream(httpx.AsyncByteStream):
+    def __init__(self, shared: _SharedHTTP, response: httpx.Response):
+        self._shared = shared
+        self._response = response
+
+    async def __aiter__(self):
+        chunks = self._response.aiter_raw()
+        while (chunk := await self._shared.run(_next_chunk(chunks))) is not None:
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self._shared.run(self._response.aclose())
+
+
+class _SharedTransport(httpx.AsyncBaseTransport):
+    """Transport for a job loop's client: sends on the shared pool and streams the body back."""
+
+    def __init__(self, shared: _SharedHTTP):
+        self._shared = shared
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        content = await request.aread()  # LLM requests are small JSON bodies
+        outbound = httpx.Request(
+            request.method, request.url, headers=request.headers, content=content, extensions=request.extensions,
+        )
+        response = await self._shared.run(self._shared.send(outbound))
+        # raw bytes: the caller's client decodes Content-Encoding as usual
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=_BridgedStream(self._shared, response),
+            extensions=response.extensions,
+        )
+
+
+async def _close(providers: Providers) -> None:
+    for p in providers.clients():
+        try:
+            await p.aclose()
+        except Exception as e:
+            log.warning("Closing %s failed: %s", type(p).__name__, e)
+
+
+# pools are bound to the event loop their connections were opened on
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ProviderPool]" = weakref.WeakKeyDictionary()
+
+
+def get_pool() -> ProviderPool:
+    """Provider pool for the running event loop."""
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = ProviderPool()
+    return pool
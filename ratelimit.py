@@ -0,0 +1,118 @@
+# ratelimit.py
+"""
+Token-bucket rate limiting for /token.
+
+Every token can start a full agent session (STT, LLM and TTS), so /token is
+limited per client and globally. Each client (IP address, or its /64 for IPv6,
+since one host usually owns the whole prefix) gets a bucket of
+TOKEN_BURST_PER_IP refilled at TOKEN_RATE_PER_IP per second; all requests
+also draw from one global bucket (TOKEN_BURST_GLOBAL, TOKEN_RATE_GLOBAL).
+A request over either limit is refused with the time until it would pass,
+which the server sends as 429 with Retry-After.
+
+A bucket is two floats. Buckets are kept in least-recently-used order, and
+the ones untouched long enough to have refilled completely are evicted
+lazily on each check, which forgets nothing. Memory therefore follows the
+number of active clients, capped at RATE_LIMIT_MAX_CLIENTS.
+
+Counters in metrics: token_requests_limited_ip,
+token_requests_limited_global; gauge rate_limit_clients.
+"""
+
+import ipaddress
+import math
+import os
+import time
+from collections import OrderedDict
+
+import metrics
+
+RATE_PER_IP = float(os.getenv("TOKEN_RATE_PER_IP", "0.2"))
+BURST_PER_IP = float(os.getenv("TOKEN_BURST_PER_IP", "5"))
+RATE_GLOBAL = float(os.getenv("TOKEN_RATE_GLOBAL", "50"))
+BURST_GLOBAL = float(os.getenv("TOKEN_BURST_GLOBAL", "100"))
+MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "100000"))
+# use the last X-Forwarded-For hop, as added by our own reverse proxy
+TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "0").lower() in ("1", "true", "yes")
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, rate: float, burst: float, now: float) -> float:
+        """Take one token; returns 0 if granted, else the seconds until one is available."""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / rate if rate > 0 else math.inf
+
+
+def client_key(peer: str, forwarded_for: str | None = None) -> str:
+    """Bucket key for a client: its IPv4 address or IPv6 /64."""
+    if TRUST_PROXY and forwarded_for:
+        peer = forwarded_for.split(",")[-1].strip()
+    try:
+        addr = ipaddress.ip_address(peer)
+    except ValueError:
+        return peer
+    if addr.version == 6:
+        if addr.ipv4_mapped is not None:
+            return str(addr.ipv4_mapped)
+        return str(ipaddress.ip_network(f"{addr}/64", strict=False))
+    return str(addr)
+
+
+class RateLimiter:
+    def __init__(self, rate: float = RATE_PER_IP, burst: float = BURST_PER_IP,
+                 global_rate: float = RATE_GLOBAL, global_burst: float = BURST_GLOBAL,
+                 max_clients: int = MAX_CLIENTS):
+        self.rate, self.burst = rate, burst
+        self.global_rate, self.global_burst = global_rate, global_burst
+        self._max = max_clients
+        # a bucket idle this long is full again, so dropping it changes nothing
+        self._idle = burst / rate if rate > 0 else math.inf
+        self._clients: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._global = TokenBucket(global_burst, time.monotonic())
+        metrics.registry.gauge("rate_limit_clients", lambda: len(self._clients))
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def check(self, client: str, now: float | None = None) -> float:
+        """0 if the request may proceed, else the seconds the client should wait."""
+        now = time.monotonic() if now is None else now
+        self._evict(now)
+        bucket = self._clients.get(client)
+        if bucket is None:
+            bucket = self._clients[client] = TokenBucket(self.burst, now)
+        else:
+            self._clients.move_to_end(client)
+        wait = bucket.take(self.rate, self.burst, now)
+        if wait:
+            metrics.registry.inc("token_requests_limited_ip")
+            return wait
+        wait = self._global.take(self.global_rate, self.global_burst, now)
+        if wait:
+            bucket.tokens += 1.0  # not the client's fault; give its token back
+            metrics.registry.inc("token_requests_limited_global")
+            return wait
+        return 0.0
+
+    def _evict(self, now: float) -> None:
+        clients = self._clients
+        while clients:
+            key, bucket = next(iter(clients.items()))
+            if now - bucket.updated < self._idle and len(clients) <= self._max:
+                break
+            del clients[key]
+
+
+def retry_after(wait: float) -> str:
+    """Retry-After value: whole seconds, at least 1."""
+    return str(max(1, math.ceil(wait))) if math.isfinite(wait) else "3600"
@@ -0,0 +1,185 @@
+# retrieval.py
+"""
+In-process BM25 index over the product catalog and context/ files (all but
+the FAQ seed, see context_store.FAQ_FILE).
+
+Each product in a *.json catalog becomes one chunk; other files are split on
+blank lines. Per-(term, chunk) BM25 weights are precomputed into flat NumPy
+arrays, so a query is a handful of scatter-adds plus an argpartition.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from typing import Mapping, NamedTuple
+
+import numpy as np
+
+import context_store
+
+log = logging.getLogger("retrieval")
+
+TOP_K = int(os.getenv("CONTEXT_TOP_K", "4"))
+MAX_CHUNK_CHARS = 800
+
+_TOKEN_RE = re.compile(r"\w+")
+_THOUSANDS_RE = re.compile(r"(?<=\d),(?=\d{3})")
+_CONTRACTION_RE = re.compile(r"['’]\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it me my of on or "
+    "our so that the this to was we what whats which with you your".split()
+)
+
+
+def _stem(token: str) -> str:
+    # plural folding is enough for product names ("packs" -> "pack")
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    text = _CONTRACTION_RE.sub("", _THOUSANDS_RE.sub("", text.lower()))
+    return [_stem(t) for t in _TOKEN_RE.findall(text) if t not in _STOPWORDS]
+
+
+class Chunk(NamedTuple):
+    source: str
+    text: str
+
+
+def _product_text(item: dict) -> str:
+    parts = []
+    for key, value in item.items():
+        if key == "id" or value in (None, ""):
+            continue
+        label = "Product" if key == "name" else key.replace("_", " ").capitalize()
+        parts.append(f"{label}: {value}")
+    return ". ".join(parts)
+
+
+def chunk_files(files: Mapping[str, str]) -> list[Chunk]:
+    """Split context files into retrievable chunks."""
+    chunks = []
+    for name, content in files.items():
+        if name == context_store.FAQ_FILE:
+            continue
+        if name.endswith(".json"):
+            try:
+                data = json.loads(content)
+            except ValueError as e:
+                log.warning("Indexing %s as text: %s", name, e)
+            else:
+                items = data if isinstance(data, list) else [data]
+                for item in items:
+                    if isinstance(item, dict):
+                        chunks.append(Chunk(name, _product_text(item)))
+                    else:
+                        chunks.append(Chunk(name, json.dumps(item, ensure_ascii=False)))
+                continue
+        for para in re.split(r"\n\s*\n", content):
+            para = para.strip()
+            while para:
+                chunks.append(Chunk(name, para[:MAX_CHUNK_CHARS]))
+                para = para[MAX_CHUNK_CHARS:].strip()
+    return chunks
+
+
+class BM25Index:
+    def __init__(self, chunks: list[Chunk], k1: float = 1.2, b: float = 0.75):
+        self.chunks = chunks
+        vocab: dict[str, int] = {}
+        term_ids, doc_ids, tfs = [], [], []
+        lengths = np.zeros(len(chunks), dtype=np.float32)
+
+        for doc, chunk in enumerate(chunks):
+            counts: dict[int, int] = {}
+            tokens = tokenize(chunk.text)
+            lengths[doc] = len(tokens)
+            for tok in tokens:
+                tid = vocab.setdefault(tok, len(vocab))
+                counts[tid] = counts.get(tid, 0) + 1
+            term_ids.extend(counts.keys())
+            doc_ids.extend([doc] * len(counts))
+            tfs.extend(counts.values())
+
+        self.vocab = vocab
+        term_ids = np.asarray(term_ids, dtype=np.int32)
+        doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        tfs = np.asarray(tfs, dtype=np.float32)
+
+        # postings grouped by term: CSR layout (offsets into doc/weight arrays)
+        order = np.argsort(term_ids, kind="stable")
+        counts_per_term = np.bincount(term_ids, minlength=len(vocab))
+        self._offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        self._offsets[1:] = np.cumsum(counts_per_term)
+        df = counts_per_term.astype(np.float32)
+        self._docs = doc_ids[order]
+
+        n = max(len(chunks), 1)
+        avgdl = float(lengths.mean()) if len(chunks) else 0.0
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        tf = tfs[order]
+        dl = lengths[self._docs] / (avgdl or 1.0)
+        self._weights = (idf[term_ids[order]] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl))).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def search(self, query: str, k: int = TOP_K) -> list[tuple[Chunk, float]]:
+        if not self.chunks:
+            return []
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        for tok in set(tokenize(query)):
+            tid = self.vocab.get(tok)
+            if tid is None:
+                continue
+            lo, hi = self._offsets[tid], self._offsets[tid + 1]
+            np.add.at(scores, self._docs[lo:hi], self._weights[lo:hi])
+
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(scores[hits], -k)[-k:]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(self.chunks[i], float(scores[i])) for i in hits]
+
+
+_index: BM25Index | None = None
+_index_version = -1
+_index_lock = threading.Lock()
+
+
+def get_index(snapshot) -> BM25Index:
+    """Index for a context snapshot, rebuilt only when the snapshot version changes."""
+    global _index, _index_version
+    with _index_lock:
+        if _index is None or _index_version != snapshot.version:
+            _index = BM25Index(chunk_files(snapshot.files))
+            _index_version = snapshot.version
+            log.info("Indexed %d chunk(s) from context v%d", len(_index), snapshot.version)
+        return _index
+
+
+def format_hits(hits: list[tuple[Chunk, float]]) -> str:
+    return "\n".join(f"- {chunk.text}" for chunk, _ in hits)
+
+
+def overview(files: Mapping[str, str], limit: int = 20) -> str:
+    """Short list of product names for the system prompt, capped at `limit`."""
+    names = []
+    for name, content in files.items():
+        if not name.endswith(".json") or name == context_store.FAQ_FILE:
+            continue
+        try:
+            data = json.loads(content)
+        except ValueError:
+            continue
+        for item in data if isinstance(data, list) else [data]:
+            if isinstance(item, dict) and item.get("name"):
+                names.append(str(item["name"]))
+    if not names:
+        return ""
+    more = f" (and {len(names) - limit} more)" if len(names) > limit else ""
+    return ", ".join(names[:limit]) + more
@@ -0,0 +1,255 @@
+# rooms.py
+"""
+Per-caller room and identity allocation for the token server, with sharding.
+
+Every new caller gets an identity and a room of their own, plus an opaque
+session key. Sending the key back (/token?session=...) returns the same room
+and identity, so a browser that reloads or drops its connection rejoins its
+call.
+
+Rooms are sharded across agent worker pools by tag. ROOM_SHARDS maps
+"region/tenant", "tenant", "region" or "*" to a list of agent names (workers
+started with AGENT_NAME set), e.g.
+  {"eu/acme": ["sales-acme-eu"], "eu": ["sales-eu-1", "sales-eu-2"], "*": ["sales"]}
+The most specific match wins, and within it the pool with the fewest active
+rooms. The caller's token then carries a room configuration that dispatches
+that agent when the room is created. With no ROOM_SHARDS, rooms are left to
+automatic dispatch as before. Rooms are named after the matched entry, never
+after the caller's own tags, so tags that are not configured all land in the
+"*" shard (or the unsharded one).
+
+RoomIndex keeps the active rooms in dicts keyed by room and by session, so
+allocation and reconnect are O(1). Rooms not asked for within
+ROOM_IDLE_TTL_SECS are dropped by the sweep. For the ROOM_RESERVE_SHARDS
+shards requested most recently, a few allocations (ROOM_RESERVE, more while
+new callers arrive faster) are prepared ahead with their tokens already
+minted, so a burst of new callers does not sign JWTs on the request path.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import secrets
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+from livekit import api
+
+import metrics
+import token_cache
+
+log = logging.getLogger("rooms")
+
+ROOM_PREFIX = os.getenv("ROOM_PREFIX", "call")
+ROOM_IDLE_TTL = float(os.getenv("ROOM_IDLE_TTL_SECS", "3600"))
+MAX_ROOMS = int(os.getenv("ROOM_INDEX_MAX", "100000"))
+RESERVE = int(os.getenv("ROOM_RESERVE", "8"))
+# the reserve follows the recent allocation rate up to this many per shard
+RESERVE_MAX = int(os.getenv("ROOM_RESERVE_MAX", "256"))
+# shards with a reserve at once; the least recently requested go without
+RESERVE_SHARDS = int(os.getenv("ROOM_RESERVE_SHARDS", "16"))
+SWEEP_INTERVAL = 1.0
+
+_TAG = re.compile(r"^[a-z0-9][a-z0-9-]{0,31}$")
+
+
+def parse_shards(raw: str) -> dict[str, list[str]]:
+    if not raw:
+        return {}
+    shards = json.loads(raw)
+    if not isinstance(shards, dict) or not all(
+        isinstance(pools, list) and pools and all(isinstance(p, str) and p for p in pools) for pools in shards.values()
+    ):
+        raise ValueError('ROOM_SHARDS must map tags to non-empty lists of agent names, e.g. {"*": ["sales"]}')
+    return shards
+
+
+def check_tag(value: str | None) -> str:
+    """Normalized region/tenant tag; ValueError if it is not a short slug."""
+    value = (value or "").strip().lower()
+    if value and not _TAG.match(value):
+        raise ValueError(f"invalid tag {value!r}")
+    return value
+
+
+@dataclass
+class RoomRecord:
+    room: str
+    identity: str
+    pool: str  # agent name dispatched to the room, "" for automatic dispatch
+    shard: str = ""  # the ROOM_SHARDS entry it was allocated under, "" when none matched
+    session: str = ""
+    created: float = field(default_factory=time.monotonic)
+    last_seen: float = field(default_factory=time.monotonic)
+
+    @property
+    def grants(self) -> api.VideoGrants:
+        return api.VideoGrants(room_join=True, room=self.room)
+
+    @property
+    def room_config(self) -> api.RoomConfiguration | None:
+        if not self.pool:
+            return None
+        return api.RoomConfiguration(agents=[api.RoomAgentDispatch(agent_name=self.pool)])
+
+
+class RoomIndex:
+    """Active rooms by room name and by session key; oldest-seen first for the sweep."""
+
+    def __init__(self, max_rooms: int = MAX_ROOMS):
+        self._max = max_rooms
+        self._rooms: OrderedDict[str, RoomRecord] = OrderedDict()
+        self._sessions: dict[str, RoomRecord] = {}
+        self.pool_rooms: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def __contains__(self, room: str) -> bool:
+        return room in self._rooms
+
+    def add(self, record: RoomRecord) -> None:
+        self._rooms[record.room] = record
+        self._sessions[record.session] = record
+        self.pool_rooms[record.pool] = self.pool_rooms.get(record.pool, 0) + 1
+        while len(self._rooms) > self._max:
+            self.remove(next(iter(self._rooms)))
+
+    def by_session(self, session: str) -> RoomRecord | None:
+        record = self._sessions.get(session)
+        if record is not None:
+            record.last_seen = time.monotonic()
+            self._rooms.move_to_end(record.room)
+        return record
+
+    def get(self, room: str) -> RoomRecord | None:
+        return self._rooms.get(room)
+
+    def remove(self, room: str) -> RoomRecord | None:
+        """Forget a room, e.g. once it is known to have ended."""
+        record = self._rooms.pop(room, None)
+        if record is not None:
+            self._sessions.pop(record.session, None)
+            self.pool_rooms[record.pool] -= 1
+        return record
+
+    def sweep(self, idle_ttl: float = ROOM_IDLE_TTL) -> int:
+        """Drop rooms idle longer than idle_ttl; touches only the expired ones."""
+        cutoff, removed = time.monotonic() - idle_ttl, 0
+        while self._rooms:
+            record = next(iter(self._rooms.values()))
+            if record.last_seen > cutoff:
+                break
+            self.remove(record.room)
+            removed += 1
+        return removed
+
+
+class Allocator:
+    def __init__(self, tokens: token_cache.TokenCache, shards: dict[str, list[str]] | None = None,
+                 index: RoomIndex | None = None, reserve: int = RESERVE):
+        self.tokens = tokens
+        self.shards = parse_shards(os.getenv("ROOM_SHARDS", "")) if shards is None else shards
+        self.index = index or RoomIndex()
+        self._reserve_size = reserve
+        self._reserves: dict[str, deque[RoomRecord]] = {}
+        self._requested: dict[str, float] = {}  # shard -> last new-caller request
+        self._allocated: dict[str, int] = {}  # shard -> new callers since the last top-up
+        self._reserved_pools: dict[str, int] = {}  # prepared rooms per pool, counted when balancing
+        self._task: asyncio.Task | None = None
+        metrics.registry.gauge("rooms_active", lambda: len(self.index))
+
+    def shard_for(self, region: str, tenant: str) -> str:
+        """The ROOM_SHARDS entry the caller's tags select, "" when none does."""
+        for tag in (f"{region}/{tenant}", tenant, region, "*"):
+            if tag and tag in self.shards:
+                return tag
+        return ""
+
+    def pools_for(self, region: str, tenant: str) -> list[str]:
+        return self.shards.get(self.shard_for(region, tenant), [""])
+
+    def _new_record(self, shard: str) -> RoomRecord:
+        pools = self.shards.get(shard, [""])
+        if len(pools) > 1:
+            load = self.index.pool_rooms
+            pool = min(pools, key=lambda p: load.get(p, 0) + self._reserved_pools.get(p, 0))
+        else:
+            pool = pools[0]
+        parts = [ROOM_PREFIX, *(shard.split("/") if shard != "*" else ()), secrets.token_hex(6)]
+        return RoomRecord(
+            room="-".join(p for p in parts if p),
+            identity=f"caller-{secrets.token_hex(6)}",
+            pool=pool,
+            shard=shard,
+        )
+
+    def token(self, record: RoomRecord) -> tuple[str, float]:
+        return self.tokens.get(record.identity, record.room, record.grants, room_config=record.room_config)
+
+    def allocate(self, region: str = "", tenant: str = "", session: str | None = None) -> tuple[RoomRecord, bool]:
+        """(record, reconnected): the caller's existing room for a known session, else a new one."""
+        if session:
+            record = self.index.by_session(session)
+            if record is not None:
+                metrics.registry.inc("rooms_reconnected")
+                return record, True
+        shard = self.shard_for(region, tenant)
+        self._requested[shard] = time.monotonic()
+        self._allocated[shard] = self._allocated.get(shard, 0) + 1
+        reserve = self._reserves.get(shard)
+        if reserve:
+            record = reserve.popleft()
+            self._reserved_pools[record.pool] -= 1
+        else:
+            record = self._new_record(shard)
+        record.session = secrets.token_urlsafe(18)
+        record.created = record.last_seen = time.monotonic()
+        self.index.add(record)
+        metrics.registry.inc("rooms_allocated")
+        return record, False
+
+    # --- background work ---
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            try:
+                removed = self.index.sweep()
+                if removed:
+                    log.info("Dropped %d idle room(s), %d active", removed, len(self.index))
+                await self.top_up()
+            except Exception:
+                log.exception("room maintenance failed")
+
+    async def top_up(self) -> None:
+        """Prepare allocations, tokens included, for shards that had new callers recently."""
+        cutoff = time.monotonic() - token_cache.HOT_WINDOW
+        allocated, self._allocated = self._allocated, {}
+        recent = sorted(self._requested.items(), key=lambda item: item[1], reverse=True)
+        for i, (shard, last) in enumerate(recent):
+            if last < cutoff or i >= RESERVE_SHARDS:
+                del self._requested[shard]
+                for record in self._reserves.pop(shard, ()):
+                    self._reserved_pools[record.pool] -= 1
+                continue
+            reserve = self._reserves.setdefault(shard, deque())
+            target = min(RESERVE_MAX, max(self._reserve_size, allocated.get(shard, 0)))
+            while len(reserve) < target:
+                record = self._new_record(shard)
+                self.token(record)
+                reserve.append(record)
+                self._reserved_pools[record.pool] = self._reserved_pools.get(record.pool, 0) + 1
+                await asyncio.sleep(0)  # one signature at a time, between requests
@@ -1,9 +1,28 @@
 # sales_agent.py
 import os
+import sys
+import time
+import asyncio
 import logging
-from pathlib import Path
+import threading
 from dotenv import load_dotenv
 
+import admission
+import barge_in
+import catalog
+import context_store
+import event_store
+import faq
+import handoff
+import llm_router
+import memory
+import metrics
+import providers
+import retrieval
+import segmenter
+import speculative
+import tts_cache
+
 # --- logging ---
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s - %(message)s")
 log = logging.getLogger("sales_agent")
@@ -16,89 +35,563 @@ try:
     from livekit.agents import (
         AutoSubscribe,
         JobContext,
+        JobExecutorType,
+        JobProcess,
+        ModelSettings,
         WorkerOptions,
         cli,
+        function_tool,
+        llm,
+        stt,
     )
-    from livekit.agents.voice import Agent
-    from livekit.plugins import openai, cartesia
+    from livekit.agents.voice import Agent, AgentSession
 except Exception as e:
     raise SystemExit(f"Missing livekit packages or incompatible versions: {e}")
 
-# Try to import silero (optional)
-try:
-    from livekit.plugins import silero
-except ImportError:
-    silero = None
-    log.warning("Silero VAD not available")
+# Plugins (cartesia, openai, silero) are imported by load_plugins(), not here:
+# the worker's main process never needs them, and it registers with LiveKit sooner
+silero = None
+
+# sentences synthesized ahead of the one currently playing
+TTS_LOOKAHEAD = int(os.getenv("TTS_LOOKAHEAD", "2"))
+
+# "thread" hosts many sessions in one process sharing the VAD model, context,
+# index, catalog, FAQ, prompt and TTS cache; "process" isolates each call
+WORKER_EXECUTOR = os.getenv("WORKER_EXECUTOR", "process").lower()
+
+# "silero" (falls back to "energy" when unavailable) or "energy"
+VAD_BACKEND = os.getenv("VAD_BACKEND", "silero").lower()
 
 # --- environment keys ---
 CARTESIA_API_KEY = os.getenv("CARTESIA_API_KEY")
 CEREBRAS_API_KEY = os.getenv("CEREBRAS_API_KEY")
 
-if not CARTESIA_API_KEY:
-    raise SystemExit("❌ Please set CARTESIA_API_KEY in your .env file")
+def require_keys() -> None:
+    # checked by the commands that run sessions, not at import, so profile-startup works without keys
+    if not CARTESIA_API_KEY:
+        raise SystemExit("❌ Please set CARTESIA_API_KEY in your .env file")
 
 # --- context loader ---
 def load_context() -> str:
-    context_dir = Path("context")
-    context_dir.mkdir(exist_ok=True)
-    all_content = ""
-    for file_path in context_dir.glob("*"):
-        if file_path.is_file():
+    return context_store.get_store().refresh().text
+
+# --- instructions ---
+def build_instructions(snapshot: context_store.ContextSnapshot) -> str:
+    overview = retrieval.overview(snapshot.files)
+    catalog_line = f"\nProducts we sell: {overview}\n" if overview else ""
+    return f"""You are a friendly, helpful sales agent. Speak naturally and warmly.
+Only use the information in the context provided with each customer message.
+{catalog_line}
+RULES:
+  - For prices, budgets and comparisons, use the product tools rather than guessing.
+  - If asked anything outside the context, say: "I don't have that information."
+  - Keep responses short and conversational for speaking.
+  - Be helpful and encouraging.
+"""
+
+_instructions: tuple[int, str] | None = None
+_instructions_lock = threading.Lock()
+
+def get_instructions(snapshot: context_store.ContextSnapshot) -> str:
+    """Instructions for a snapshot, built once per context version and shared by all sessions."""
+    global _instructions
+    with _instructions_lock:
+        if _instructions is None or _instructions[0] != snapshot.version:
+            _instructions = (snapshot.version, build_instructions(snapshot))
+        return _instructions[1]
+
+# --- TTS helpers ---
+async def _once(text: str):
+    yield text
+
+def _render_item(item) -> str:
+    if item.type == "message":
+        return f"{item.role}: {item.text_content or ''}"
+    if item.type == "function_call":
+        return f"tool call: {item.name}({item.arguments})"
+    if item.type == "function_call_output":
+        return f"tool result: {item.output}"
+    return ""
+
+def _pending_user_text(chat_ctx: llm.ChatContext) -> str | None:
+    # text of the user message this reply answers; None once tools have run
+    for item in reversed(chat_ctx.items):
+        if item.type in ("function_call", "function_call_output"):
+            return None
+        if item.type == "message" and item.role == "user":
+            return item.text_content
+    return None
+
+# --- agent ---
+class SalesAgent(Agent):
+    def __init__(
+        self,
+        snapshot: context_store.ContextSnapshot,
+        index: retrieval.BM25Index,
+        products: catalog.Catalog,
+        answers: faq.FAQCache,
+        turns: metrics.TurnTracker,
+        router: llm_router.HedgedRouter | None = None,
+        recorder: event_store.CallRecorder | None = None,
+        **kwargs,
+    ):
+        super().__init__(instructions=get_instructions(snapshot), **kwargs)
+        self._index = index
+        self._catalog = products
+        self._faq = answers
+        self._turns = turns
+        self._router = router
+        self._recorder = recorder
+        self._speculator = speculative.Speculator(self._speculative_llm) if speculative.ENABLED else None
+        self._memory = memory.ConversationMemory(self._summarize)
+        # prompt size of the running speculation, recorded only if its turn uses it
+        self._speculative_prompt: tuple[str, int] | None = None
+        self._barge_in = barge_in.BargeInController()
+
+    async def on_enter(self) -> None:
+        session = self.session
+        session.on("user_state_changed", self._on_user_state_changed)
+        if self._recorder is not None:
+            session.on("conversation_item_added", self._on_item_added)
+        audio_out = session.output.audio
+        self._barge_in.attach(
+            interrupt=session.interrupt,
+            clear_audio=audio_out.clear_buffer if audio_out is not None else None,
+            is_speaking=lambda: session.agent_state == "speaking",
+        )
+
+    def export_state(self) -> dict:
+        """Conversation so far, for a replacement worker to resume from."""
+        messages = [
+            {"role": item.role, "text": item.text_content}
+            for item in self.chat_ctx.items
+            if item.type == "message" and item.role in ("user", "assistant") and item.text_content
+        ]
+        return {"messages": messages, **self._memory.export()}
+
+    async def restore_state(self, state: dict) -> None:
+        chat_ctx = self.chat_ctx.copy()
+        for message in state.get("messages", []):
+            chat_ctx.add_message(role=message["role"], content=message["text"])
+        await self.update_chat_ctx(chat_ctx)
+        self._memory.restore(state.get("summary", ""), state.get("covered", 0))
+
+    async def aclose(self) -> None:
+        """Stop background summarization; run on job shutdown, before the loop closes."""
+        await self._memory.aclose()
+
+    def _on_item_added(self, ev) -> None:
+        item = ev.item
+        if item.type == "message" and item.role in ("user", "assistant") and item.text_content:
+            self._recorder.transcript(item.role, item.text_content, interrupted=item.interrupted)
+
+    def _on_user_state_changed(self, ev) -> None:
+        if ev.old_state == "speaking":
+            self._turns.mark("speech_end")
+        elif ev.new_state == "speaking" and barge_in.ENABLED:
+            self._barge_in.on_speech_start()
+
+    async def stt_node(self, audio, model_settings):
+        async for ev in Agent.default.stt_node(self, audio, model_settings):
+            if isinstance(ev, stt.SpeechEvent):
+                if ev.type == stt.SpeechEventType.END_OF_SPEECH:
+                    self._turns.mark("speech_end")
+                elif ev.type == stt.SpeechEventType.FINAL_TRANSCRIPT:
+                    self._turns.mark("stt_final")
+                elif self._speculator and ev.type in (
+                    stt.SpeechEventType.INTERIM_TRANSCRIPT,
+                    stt.SpeechEventType.PREFLIGHT_TRANSCRIPT,
+                ) and ev.alternatives:
+                    text = ev.alternatives[0].text
+                    if self._faq.match(text, record=False) is None:
+                        self._speculator.on_interim(text)
+            yield ev
+
+    def _speculative_llm(self, text: str):
+        # same context the real turn will have, built from the interim text
+        chat_ctx = self.chat_ctx.copy()
+        chat_ctx.add_message(role="user", content=text)
+        self._add_relevant_context(chat_ctx, text)
+        bounded, prompt_tokens = self._bounded_ctx(chat_ctx)
+        self._speculative_prompt = (text, prompt_tokens)
+        return self._llm_stream(bounded, self.tools, ModelSettings())
+
+    def _llm_stream(self, chat_ctx, tools, model_settings):
+        # hedged across LLM_BACKENDS when configured, else the agent's own LLM
+        if self._router is not None:
+            return self._router.chat(chat_ctx, tools, model_settings)
+        return Agent.default.llm_node(self, chat_ctx, tools, model_settings)
+
+    def _bounded_ctx(self, chat_ctx: llm.ChatContext) -> tuple[llm.ChatContext, int]:
+        # system prompt + rolling summary + the most recent turns, within the token budget
+        preamble, turns = [], []
+        for item in chat_ctx.items:
+            if item.type == "message" and item.role == "user":
+                turns.append([item])
+            elif turns:
+                turns[-1].append(item)
+            elif item.type == "message" and item.role in ("system", "developer"):
+                preamble.append(item)
+            else:
+                turns.append([item])
+
+        reserved = sum(memory.estimate_tokens(_render_item(item)) for item in preamble)
+        summary, recent, prompt_tokens = self._memory.select(turns, _render_item, reserved)
+
+        bounded = llm.ChatContext(preamble)
+        if summary:
+            bounded.add_message(role="system", content=f"Summary of the earlier conversation: {summary}")
+        bounded.items.extend(item for turn in recent for item in turn)
+        return bounded, prompt_tokens
+
+    def _record_prompt(self, prompt_tokens: int) -> None:
+        self._turns.flag("prompt_tokens", prompt_tokens)
+        metrics.registry.inc("prompt_tokens", prompt_tokens)
+
+    async def _summarize(self, previous: str, transcript: str) -> str:
+        return await memory.llm_summarizer(self.llm)(previous, transcript)
+
+    async def on_user_turn_completed(self, turn_ctx: llm.ChatContext, new_message: llm.ChatMessage) -> None:
+        self._turns.mark("turn_committed")
+        self._add_relevant_context(turn_ctx, new_message.text_content or "")
+
+    def _add_relevant_context(self, chat_ctx: llm.ChatContext, text: str) -> None:
+        # inject only the top-k relevant catalog entries for this turn
+        hits = self._index.search(text)
+        if not hits:
+            return
+        chat_ctx.add_message(
+            role="system",
+            content=f"Context relevant to the customer's message:\n{retrieval.format_hits(hits)}",
+        )
+
+    async def llm_node(self, chat_ctx, tools, model_settings):
+        self._turns.mark("llm_start", first=True)
+        # answer known questions locally, skipping the LLM round trip
+        user_text = _pending_user_text(chat_ctx)
+        hit = self._faq.match(user_text) if user_text else None
+        if hit is not None:
+            answer, score = hit
+            log.info("💡 FAQ hit (%.2f) for %r", score, user_text)
+            if self._speculator:
+                self._speculator.reset()
+            self._turns.flag("faq")
+            self._turns.mark("llm_first_token", first=True)
+            yield answer
+            return
+
+        # reuse a generation started on the interim transcript if it matches
+        spec = self._speculator.take(user_text) if self._speculator and user_text else None
+        if spec is not None:
+            self._turns.flag("speculative")
+            if self._speculative_prompt is not None and self._speculative_prompt[0] == spec.text:
+                self._record_prompt(self._speculative_prompt[1])
+            stream = spec.replay()
+        else:
+            bounded, prompt_tokens = self._bounded_ctx(chat_ctx)
+            self._record_prompt(prompt_tokens)
+            stream = self._llm_stream(bounded, tools, model_settings)
+        # run the stream in a task a barge-in can cancel mid-request
+        stream = self._barge_in.guard(stream)
+        first = True
+        try:
+            async for chunk in stream:
+                if first:
+                    first = False
+                    self._turns.mark("llm_first_token", first=True)
+                yield chunk
+        finally:
+            if spec is not None:
+                spec.cancel()
+
+    async def tts_node(self, text, model_settings):
+        first = True
+        async for frame in self._cached_tts(text, model_settings):
+            if first:
+                first = False
+                self._turns.mark("tts_first_audio", first=True)
+                self._turns.finish()
+            yield frame
+
+    async def _cached_tts(self, text, model_settings):
+        # segment the reply as it streams and synthesize up to TTS_LOOKAHEAD
+        # segments ahead, yielding audio strictly in order
+        order: asyncio.Queue = asyncio.Queue()
+        lookahead = asyncio.Semaphore(max(1, TTS_LOOKAHEAD))
+        tasks = []
+
+        async def produce():
             try:
-                content = file_path.read_text(encoding="utf-8")
-                all_content += f"\n=== {file_path.name} ===\n{content}\n"
+                async for sentence in segmenter.segment(text):
+                    await lookahead.acquire()
+                    if not tasks:
+                        self._turns.mark("tts_start")
+                    frames: asyncio.Queue = asyncio.Queue()
+                    task = asyncio.create_task(self._synthesize(sentence, frames, model_settings))
+                    tasks.append(self._barge_in.track_task(task))
+                    await order.put(frames)
+            finally:
+                # also reached on barge-in cancellation, so the consumer stops
+                order.put_nowait(None)
+
+        producer = self._barge_in.track_task(asyncio.create_task(produce()))
+        try:
+            while (frames := await order.get()) is not None:
+                try:
+                    while (frame := await frames.get()) is not None:
+                        if isinstance(frame, BaseException):
+                            raise frame
+                        yield frame
+                finally:
+                    lookahead.release()
+            await asyncio.wait([producer])
+            if not producer.cancelled():  # cancelled means a barge-in, not an error
+                producer.result()
+        finally:
+            producer.cancel()
+            for task in tasks:
+                task.cancel()
+
+    async def _synthesize(self, sentence: str, frames: asyncio.Queue, model_settings) -> None:
+        # serve repeated sentences from the audio cache, synthesize the rest
+        try:
+            cache = tts_cache.get_cache()
+            sample_rate = self.tts.sample_rate
+            key = None
+            if len(sentence) <= tts_cache.MAX_TEXT_CHARS:
+                key = cache.key(sentence, sample_rate, tts_cache.tts_params(self.tts))
+                cached = await cache.get(key)
+                if cached is not None:
+                    for frame in cached.frames():
+                        frames.put_nowait(frame)
+                    return
+
+            pcm = bytearray()
+            num_channels = 1
+            async for frame in Agent.default.tts_node(self, _once(sentence), model_settings):
+                pcm += frame.data.tobytes()
+                sample_rate, num_channels = frame.sample_rate, frame.num_channels
+                frames.put_nowait(frame)
+            if key is not None and pcm:
+                cache.put(key, tts_cache.CachedAudio(sample_rate, num_channels, bytes(pcm)))
+        except Exception as e:
+            frames.put_nowait(e)
+        finally:
+            frames.put_nowait(None)
+
+    @function_tool
+    async def lookup_product(self, name: str) -> str:
+        """Look up a product by name and return its price and description.
+
+        Args:
+            name: The product name, or part of it, as the customer said it.
+        """
+        matches = self._catalog.find(name)
+        if not matches:
+            return "No matching product."
+        return "\n".join(p.describe() for p in matches)
+
+    @function_tool
+    async def find_products_in_budget(self, max_price: float, min_price: float = 0, currency: str = "") -> str:
+        """List products the customer can afford, cheapest first.
+
+        Args:
+            max_price: The most the customer wants to spend, as a plain number.
+            min_price: The least the customer wants to spend, as a plain number.
+            currency: The currency of the budget as an ISO code or symbol, e.g. "NGN" or "$"; empty if not said.
+        """
+        code = None
+        if currency:
+            code = catalog.normalize_currency(currency)
+            if code is None or code not in self._catalog.currencies:
+                priced_in = ", ".join(sorted(self._catalog.currencies)) or "no currency"
+                return f"Our prices are in {priced_in}, not {currency}. Ask the customer for a budget in {priced_in}."
+        matches = self._catalog.in_budget(max_price, min_price, code)
+        if not matches:
+            return "No products in that price range."
+        return "\n".join(f"{p.name}: {p.price_text}" for p in matches[:10])
+
+    @function_tool
+    async def compare_products(self, names: list[str]) -> str:
+        """Compare the prices of two or more products.
+
+        Args:
+            names: The product names to compare.
+        """
+        found = []
+        for name in names:
+            matches = self._catalog.find(name, limit=1, min_overlap=1.0)
+            if not matches:
+                return f"No product matching {name!r}."
+            found.append(matches[0])
+        lines = [p.describe() for p in found]
+        priced = sorted((p for p in found if p.price is not None), key=lambda p: p.price)
+        if len(priced) >= 2 and priced[0].currency == priced[-1].currency:
+            diff = catalog.format_price(priced[-1].price - priced[0].price, priced[0].currency)
+            lines.append(f"{priced[-1].name} costs {diff} more than {priced[0].name}.")
+        return "\n".join(lines)
+
+# --- plugin loader ---
+def load_plugins() -> None:
+    """Import the provider and VAD plugins.
+
+    Plugins register themselves on import, which livekit only allows on the
+    main thread: job processes call this from prewarm, and thread mode calls it
+    before the worker starts.
+    """
+    global silero
+    providers.load_plugins()
+    if silero is None and VAD_BACKEND == "silero":
+        try:
+            from livekit.plugins import silero
+        except ImportError:
+            silero = False
+            log.warning("Silero VAD not available, using the energy VAD")
+
+# --- VAD loader ---
+_vad = None
+_vad_lock = threading.Lock()
+
+def load_vad():
+    """Load the VAD once per process; sessions share the model and open their own streams."""
+    global _vad
+    with _vad_lock:
+        if _vad is None and silero and VAD_BACKEND == "silero":
+            try:
+                _vad = silero.VAD.load()
             except Exception as e:
-                log.warning("Skipped %s: %s", file_path.name, e)
-    return all_content.strip() or "No context files found"
+                log.warning(f"VAD init failed: {e}, using the energy VAD")
+        if _vad is None:
+            import energy_vad
+
+            _vad = energy_vad.EnergyVAD.load()
+        return _vad
+
+# --- prewarm: executes once per worker process ---
+def prewarm(proc: JobProcess):
+    require_keys()
+    started = time.perf_counter()
+
+    metrics.start_exporter()
+    load_plugins()
+    plugin_secs = time.perf_counter() - started
+    proc.userdata["vad"] = load_vad()
+    vad_secs = time.perf_counter() - started - plugin_secs
+
+    # shared, read-only per-process state
+    snapshot = context_store.get_store().refresh()
+    retrieval.get_index(snapshot)
+    catalog.get_catalog(snapshot)
+    faq.get_faq(snapshot)
+    get_instructions(snapshot)
+
+    elapsed = time.perf_counter() - started
+    proc.userdata["prewarm_secs"] = elapsed
+    log.info(
+        "🔥 Prewarm done in %.2fs (plugins %.2fs, VAD %.2fs, context %.2fs)",
+        elapsed, plugin_secs, vad_secs, elapsed - plugin_secs - vad_secs,
+    )
 
 # --- entrypoint: executes per job ---
 async def entrypoint(ctx: JobContext):
     log.info("🚀 Sales Agent starting...")
+    admission.track_session(ctx)
 
-    # Load context
-    context_data = load_context()
-    log.info("✅ Loaded context (%d chars)", len(context_data))
+    # Lease the STT/TTS/LLM clients first: their TLS and websocket setup runs
+    # while the context loads and the room connects
+    pool = providers.get_pool()
+    leased = pool.acquire()
 
-    # Instructions for the agent
-    initial_instructions = f"""You are a friendly, helpful sales agent. Speak naturally and warmly.
-Only use the information in the context below.
+    async def release_providers():
+        await pool.release(leased)
 
-{context_data}
+    ctx.add_shutdown_callback(release_providers)
 
-RULES:
-  - If asked anything outside the context, say: "I don't have that information."
-  - Keep responses short and conversational for speaking.
-  - Be helpful and encouraging.
-"""
+    # Load context (cached per worker, rescanned off the event loop)
+    snapshot = await context_store.get_store().refresh_async()
+    log.info("✅ Loaded context v%d (%d chars)", snapshot.version, len(snapshot.text))
+    index = await asyncio.to_thread(retrieval.get_index, snapshot)
+    products = await asyncio.to_thread(catalog.get_catalog, snapshot)
+    answers = await asyncio.to_thread(faq.get_faq, snapshot)
 
-    # Initialize VAD (try silero, fall back to None)
-    vad_instance = None
-    if silero:
-        try:
-            vad_instance = silero.VAD.load()
-            log.info("VAD loaded")
-        except Exception as e:
-            log.warning(f"VAD init failed: {e}, using no VAD")
+    # Reuse the VAD loaded by prewarm; load here only if prewarm did not run
+    if "vad" in ctx.proc.userdata:
+        vad_instance = ctx.proc.userdata["vad"]
+        log.info("♻️ Reused prewarmed resources (saved %.2fs)", ctx.proc.userdata.get("prewarm_secs", 0.0))
+    else:
+        load_plugins()
+        vad_instance = ctx.proc.userdata["vad"] = load_vad()
+        log.info("VAD loaded")
 
-    # Connect to the room
+    # Connect to the room; a call handed off by a draining worker resumes from its saved state
     await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
     log.info("Connected to room")
+    resumed = await asyncio.to_thread(handoff.claim_state, ctx.room.name)
+
+    # transcripts and turn timings, written behind the call by the worker's event store
+    recorder = event_store.CallRecorder(ctx.room.name, ctx.job.id)
+    turns = metrics.TurnTracker(room=ctx.room.name, session_id=ctx.job.id, sink=recorder.turn)
+    call_started = time.time()
+    recorder.record("call_start", resumed_from=resumed.get("job_id") if resumed else None)
+
+    async def record_call_end(reason: str):
+        recorder.record("call_end", reason=reason, duration_s=round(time.time() - call_started, 1), turns=turns.turn)
+        await recorder.aflush()
+
+    ctx.add_shutdown_callback(record_call_end)
 
-    # Create the voice agent - this automatically starts it
-    agent = Agent(
-        instructions=initial_instructions,
+    # Create the voice agent; the session below starts it
+    agent = SalesAgent(
+        snapshot,
+        index,
+        products,
+        answers,
+        turns,
+        leased.router,
+        recorder,
         vad=vad_instance,
-        stt=cartesia.STT(),
-        llm=openai.LLM.with_cerebras(model="llama-3.3-70b"),
-        tts=cartesia.TTS(),
+        stt=leased.stt,
+        llm=leased.llm,
+        tts=leased.tts,
         allow_interruptions=True,
     )
-    
-    # The agent lifecycle is managed by the framework
-    # Just call on_enter to start the session
-    await agent.on_enter()
+    if resumed is not None:
+        await agent.restore_state(resumed)
+        log.info("🤝 Resumed %s with %d message(s) from job %s",
+                 ctx.room.name, len(resumed.get("messages", [])), resumed.get("job_id"))
+    handoff.SessionHandoff(ctx, agent.export_state).start()
+    ctx.add_shutdown_callback(agent.aclose)
+
+    # The session runs the agent's STT/LLM/TTS pipeline on the room and calls on_enter
+    session = AgentSession()
+    await session.start(agent=agent, room=ctx.room)
     log.info("🗣️ Voice agent started")
 
+def load_fnc(worker) -> float:
+    handoff.watch_worker(worker)
+    return admission.load_fnc(worker)
+
 if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint))
+    if sys.argv[1:2] == ["profile-startup"]:
+        import startup_profile
+
+        raise SystemExit(startup_profile.main(sys.argv[2:]))
+    require_keys()
+    # jobs running on threads of this process, and the commands that use plugins
+    # from the main process, need them registered here on the main thread
+    if WORKER_EXECUTOR == "thread" or sys.argv[1:2] in (["console"], ["download-files"]):
+        load_plugins()
+    admission.lag_dir()  # created before job processes start so they inherit it
+    metrics.start_server()
+    cli.run_app(
+        WorkerOptions(
+            entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm,
+            request_fnc=admission.request_fnc,
+            load_fnc=load_fnc,
+            load_threshold=admission.LOAD_THRESHOLD,
+            drain_timeout=handoff.DRAIN_TIMEOUT,
+            agent_name=handoff.AGENT_NAME,
+            job_executor_type=JobExecutorType.THREAD if WORKER_EXECUTOR == "thread" else JobExecutorType.PROCESS,
+        )
+    )
@@ -0,0 +1,95 @@
+# segmenter.py
+"""
+Streaming sentence/clause segmenter between the LLM and TTS.
+
+Text arrives in arbitrary chunks from the LLM stream. A boundary is only
+emitted once the character after the punctuation has been seen, so prices like
+"₦50,000.00", decimals, abbreviations ("e.g.", "Mr.") and tokens such as
+"HTML/CSS/JS" are never cut in half. The first segment of a reply may end at a
+clause boundary (comma, semicolon, colon, dash) so speech can start as early
+as possible; later segments prefer whole sentences.
+"""
+
+import os
+import re
+from typing import AsyncIterable, AsyncIterator
+
+FIRST_CLAUSE_MIN_CHARS = int(os.getenv("TTS_FIRST_CLAUSE_MIN_CHARS", "20"))
+CLAUSE_MIN_CHARS = int(os.getenv("TTS_CLAUSE_MIN_CHARS", "80"))
+MIN_SEGMENT_CHARS = 8
+
+ABBREVIATIONS = frozenset(
+    "mr mrs ms dr prof sr jr st vs etc approx est dept no inc ltd co corp e.g i.e a.m p.m".split()
+)
+
+_SENTENCE_END = ".!?…"
+_CLAUSE_END = ",;:—–"
+_CLOSERS = "\"'”’)]"
+_WORD_BEFORE_RE = re.compile(r"([\w.]+)\.$")
+
+
+def _is_abbreviation(text: str) -> bool:
+    """True if the period at the end of `text` belongs to an abbreviation or initial."""
+    m = _WORD_BEFORE_RE.search(text)
+    if not m:
+        return False
+    word = m.group(1).lower()
+    return word in ABBREVIATIONS or (len(word) == 1 and word.isalpha())
+
+
+class SentenceSegmenter:
+    def __init__(self):
+        self._buf = ""
+        self._emitted = 0
+
+    def _boundary(self) -> int:
+        """Index just past the first usable boundary in the buffer, or -1."""
+        buf = self._buf
+        clause_min = FIRST_CLAUSE_MIN_CHARS if self._emitted == 0 else CLAUSE_MIN_CHARS
+        for i, ch in enumerate(buf[:-1]):
+            if ch == "\n":
+                if i >= MIN_SEGMENT_CHARS:
+                    return i + 1
+                continue
+            if ch not in _SENTENCE_END and ch not in _CLAUSE_END:
+                continue
+            # include closing quotes/brackets, then require whitespace after
+            j = i + 1
+            while j < len(buf) and buf[j] in _CLOSERS:
+                j += 1
+            if j >= len(buf) or not buf[j].isspace():
+                continue  # "50,000", "1.5", "a.m" or undecided yet
+            if i + 1 < MIN_SEGMENT_CHARS:
+                continue
+            if ch in _SENTENCE_END:
+                if ch == "." and _is_abbreviation(buf[: i + 1]):
+                    continue
+                return j
+            if i + 1 >= clause_min:
+                return j
+        return -1
+
+    def push(self, text: str) -> list[str]:
+        """Feed a chunk; return the segments it completed."""
+        self._buf += text
+        out = []
+        while (end := self._boundary()) > 0:
+            segment, self._buf = self._buf[:end].strip(), self._buf[end:].lstrip()
+            if segment:
+                out.append(segment)
+                self._emitted += 1
+        return out
+
+    def flush(self) -> list[str]:
+        segment, self._buf = self._buf.strip(), ""
+        return [segment] if segment else []
+
+
+async def segment(text: AsyncIterable[str]) -> AsyncIterator[str]:
+    """Split a streamed reply into speakable segments as soon as each one is complete."""
+    seg = SentenceSegmenter()
+    async for chunk in text:
+        for s in seg.push(chunk):
+            yield s
+    for s in seg.flush():
+        yield s
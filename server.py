@@ -1,62 +1,294 @@
-import http.server
-import socketserver
+# server.py
+"""
+Token and static file server for the browser test client.
+
+Serves /token (a room, identity and LiveKit access token per caller, see
+rooms.py) and the files under
+SERVER_DIRECTORY allowed by STATIC_ALLOW, with / mapped to test_interface.html. It runs on asyncio
+streams: every connection is its own coroutine, so a slow client downloading
+livekit-client.umd.js no longer holds up token requests behind it. HTTP/1.1
+connections are kept alive (SERVER_KEEPALIVE_TIMEOUT). Static files carry
+strong ETags and Cache-Control, go out precompressed when the client accepts
+it, and are sent with loop.sendfile (see static_files.py).
+
+Credentials are read once at startup and tokens come from token_cache, which
+re-mints them ahead of expiry, so requests normally never sign a JWT. /token
+is rate limited per client and globally (ratelimit.py). Server counters are
+on /metrics.
+
+Usage:
+  python server.py
+  python load_test.py --concurrency 500 --duration 10   # in another shell
+"""
+
+import asyncio
 import json
+import logging
 import os
-from livekit import api
+import time
+from email.utils import formatdate
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
 from dotenv import load_dotenv
 
+import metrics
+import ratelimit
+import rooms
+import static_files
+import token_cache
+
 # Load environment variables
 load_dotenv()
 
-PORT = 8000
-DIRECTORY = "."
-
-class Handler(http.server.SimpleHTTPRequestHandler):
-    def do_GET(self):
-        if self.path == '/':
-            self.path = '/test_interface.html'
-            return http.server.SimpleHTTPRequestHandler.do_GET(self)
-        
-        if self.path == '/token':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            
-            # Generate token
-            api_key = os.getenv("LIVEKIT_API_KEY")
-            api_secret = os.getenv("LIVEKIT_API_SECRET")
-            livekit_url = os.getenv("LIVEKIT_URL")
-
-            if not api_key or not api_secret or not livekit_url:
-                self.wfile.write(json.dumps({"error": "Missing environment variables"}).encode())
-                return
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s - %(message)s")
+log = logging.getLogger("server")
+
+HOST = os.getenv("SERVER_HOST", "")
+PORT = int(os.getenv("SERVER_PORT", "8000"))
+DIRECTORY = Path(os.getenv("SERVER_DIRECTORY", ".")).resolve()
+KEEPALIVE_TIMEOUT = float(os.getenv("SERVER_KEEPALIVE_TIMEOUT", "15"))
+# connections past this are closed on accept rather than queued behind the others
+MAX_CONNECTIONS = int(os.getenv("SERVER_MAX_CONNECTIONS", "10000"))
+BACKLOG = int(os.getenv("SERVER_BACKLOG", "4096"))
+# request line plus headers; larger requests get 431
+MAX_HEADER_BYTES = 16 * 1024
+
+INDEX = "test_interface.html"
+
+_REASONS = {
+    200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    408: "Request Timeout", 413: "Content Too Large", 429: "Too Many Requests", 431: "Request Header Fields Too Large",
+    500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    query: str
+    version: str
+    headers: dict[str, str]
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+
+class BadRequest(Exception):
+    def __init__(self, status: int):
+        self.status = status
+
+
+async def read_request(reader: asyncio.StreamReader) -> Request | None:
+    """Next request on the connection, or None when the client has closed it."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if e.partial.strip():
+            raise BadRequest(400)
+        return None
+    except asyncio.LimitOverrunError:
+        raise BadRequest(431)
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split()
+    if len(parts) != 3 or not parts[2].startswith("HTTP/1."):
+        raise BadRequest(400)
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, sep, value = line.partition(":")
+        if not sep:
+            raise BadRequest(400)
+        headers[name.strip().lower()] = value.strip()
+    # no route takes a body; one is refused and the connection closed without reading it
+    if "transfer-encoding" in headers:
+        raise BadRequest(413)
+    length = headers.get("content-length", "0")
+    if not length.isdigit():
+        raise BadRequest(400)
+    if int(length):
+        raise BadRequest(413)
+    target = urlsplit(parts[1])
+    return Request(parts[0].upper(), unquote(target.path), target.query, parts[2], headers)
+
+
+def _head(status: int, headers: dict[str, str], keep_alive: bool) -> bytes:
+    lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}", f"Date: {formatdate(usegmt=True)}"]
+    lines += [f"{k}: {v}" for k, v in headers.items()]
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def send(writer: asyncio.StreamWriter, req: Request | None, status: int, body: bytes,
+               content_type: str, keep_alive: bool, extra: dict[str, str] | None = None) -> None:
+    headers = {"Content-Type": content_type, "Content-Length": str(len(body)), **(extra or {})}
+    writer.write(_head(status, headers, keep_alive))
+    if req is None or req.method != "HEAD":
+        writer.write(body)
+    await writer.drain()
+
+
+async def send_json(writer, req, status: int, payload: dict, keep_alive: bool, extra: dict | None = None) -> None:
+    await send(writer, req, status, json.dumps(payload).encode(), "application/json", keep_alive, extra)
+
 
-            # Create a random participant name or use a default
-            participant_name = "TestUser"
-            room_name = "test-room"
-
-            grant = api.VideoGrants(
-                room_join=True,
-                room=room_name,
-            )
-            
-            token = api.AccessToken(api_key, api_secret) \
-                .with_identity(participant_name) \
-                .with_name(participant_name) \
-                .with_grants(grant) \
-                .to_jwt()
-            
-            response = {
-                "token": token,
-                "url": livekit_url,
-                "room": room_name
-            }
-            
-            self.wfile.write(json.dumps(response).encode())
+# --- routes ---
+CREDENTIALS = token_cache.Credentials.from_env()
+_allocator: rooms.Allocator | None = None
+
+
+def get_allocator() -> rooms.Allocator | None:
+    global _allocator
+    if _allocator is None and CREDENTIALS is not None:
+        _allocator = rooms.Allocator(token_cache.TokenCache(CREDENTIALS))
+    return _allocator
+
+
+def make_token(query: str) -> tuple[int, dict]:
+    """/token?region=..&tenant=..&session=..: the caller's room and a token to join it."""
+    allocator = get_allocator()
+    if allocator is None:
+        return 500, {"error": "Missing environment variables"}
+    params = {k: v[0] for k, v in parse_qs(query).items()}
+    try:
+        region, tenant = rooms.check_tag(params.get("region")), rooms.check_tag(params.get("tenant"))
+    except ValueError as e:
+        return 400, {"error": str(e)}
+    record, reconnected = allocator.allocate(region, tenant, params.get("session"))
+    token, _ = allocator.token(record)
+    return 200, {
+        "token": token,
+        "url": allocator.tokens.credentials.url,
+        "room": record.room,
+        "identity": record.identity,
+        "session": record.session,
+        "reconnected": reconnected,
+    }
+
+
+_limiter = ratelimit.RateLimiter()
+
+
+async def handle_token(req: Request, writer: asyncio.StreamWriter, keep_alive: bool) -> None:
+    # each token can start an agent session, so callers are limited before anything is allocated
+    peer = writer.get_extra_info("peername")
+    client = ratelimit.client_key(peer[0] if peer else "", req.headers.get("x-forwarded-for"))
+    wait = _limiter.check(client)
+    if wait:
+        await send_json(writer, req, 429, {"error": "Too many requests"}, keep_alive,
+                        {"Retry-After": ratelimit.retry_after(wait), "Cache-Control": "no-store"})
+        return
+    status, payload = make_token(req.query)
+    await send_json(writer, req, status, payload, keep_alive, {"Cache-Control": "no-store"})
+
+
+async def handle_metrics(req: Request, writer: asyncio.StreamWriter, keep_alive: bool) -> None:
+    body = metrics.registry.prometheus().encode()
+    await send(writer, req, 200, body, "text/plain; version=0.0.4", keep_alive, {"Cache-Control": "no-store"})
+
+
+_static = static_files.StaticFiles(DIRECTORY)
+
+
+async def handle_static(req: Request, writer: asyncio.StreamWriter, keep_alive: bool) -> None:
+    target = _static.resolve(INDEX if req.path == "/" else req.path)
+    if target is None:
+        await send(writer, req, 404, b"not found\n", "text/plain", keep_alive)
+        return
+    asset = await _static.get(target)
+    encoding = _static.choose(asset, req.headers.get("accept-encoding", ""))
+    etag = asset.etag(encoding)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": asset.cache_control,
+        "Last-Modified": asset.last_modified,
+    }
+    if asset.compressible:
+        headers["Vary"] = "Accept-Encoding"
+    if _static.not_modified(asset, etag, req.headers):
+        metrics.registry.inc("static_not_modified")
+        writer.write(_head(304, headers, keep_alive))
+        await writer.drain()
+        return
+
+    path, size = asset.variants[encoding] if encoding else (asset.path, asset.size)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    with open(path, "rb") as f:
+        writer.write(_head(200, {"Content-Type": asset.content_type, "Content-Length": str(size), **headers}, keep_alive))
+        await writer.drain()
+        if req.method != "HEAD" and size:
+            await asyncio.get_running_loop().sendfile(writer.transport, f, 0, size)
+    metrics.registry.inc("static_bytes_sent", size)
+
+
+# --- connections ---
+_connections = 0
+
+
+async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    global _connections
+    _connections += 1
+    try:
+        if _connections > MAX_CONNECTIONS:
+            await send(writer, None, 503, b"busy\n", "text/plain", False)
             return
+        while True:
+            try:
+                req = await asyncio.wait_for(read_request(reader), KEEPALIVE_TIMEOUT)
+            except BadRequest as e:
+                await send(writer, None, e.status, f"{_REASONS[e.status].lower()}\n".encode(), "text/plain", False)
+                return
+            except asyncio.TimeoutError:
+                return  # idle keep-alive connection
+            if req is None:
+                return
+            keep_alive = req.keep_alive
+            started = time.perf_counter()
+            if req.method not in ("GET", "HEAD"):
+                await send(writer, req, 405, b"method not allowed\n", "text/plain", keep_alive, {"Allow": "GET, HEAD"})
+            elif req.path == "/token":
+                await handle_token(req, writer, keep_alive)
+            elif req.path == "/metrics":
+                await handle_metrics(req, writer, keep_alive)
+            else:
+                await handle_static(req, writer, keep_alive)
+            log.debug("%s %s %.1f ms", req.method, req.path, (time.perf_counter() - started) * 1000)
+            if not keep_alive:
+                return
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    except Exception:
+        log.exception("request failed")
+    finally:
+        _connections -= 1
+        writer.close()
+
+
+async def main() -> None:
+    allocator = get_allocator()
+    if allocator is None:
+        log.warning("LIVEKIT_URL, LIVEKIT_API_KEY or LIVEKIT_API_SECRET not set; /token will return an error")
+    else:
+        allocator.tokens.start()
+        allocator.start()
+    await _static.precompress()
+    server = await asyncio.start_server(
+        handle_connection, HOST or None, PORT, limit=MAX_HEADER_BYTES, backlog=BACKLOG, reuse_address=True,
+    )
+    print(f"Server running at http://localhost:{PORT}")
+    async with server:
+        await server.serve_forever()
 
-        return http.server.SimpleHTTPRequestHandler.do_GET(self)
 
-print(f"Server running at http://localhost:{PORT}")
-with socketserver.TCPServer(("", PORT), Handler) as httpd:
-    httpd.serve_forever()
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
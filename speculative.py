@@ -0,0 +1,143 @@
+# speculative.py
+"""
+Speculative LLM generation on interim STT transcripts (opt-in).
+
+When an interim transcript has not changed for SPECULATIVE_STABLE_MS, the LLM
+is started on it while the caller's end-of-speech silence is still being
+measured. If the final transcript normalizes to the same text, the buffered
+output is replayed and the live stream continues; otherwise the speculation is
+cancelled and the normal path runs. Hits, misses and the tokens thrown away
+are counted in the metrics registry.
+"""
+
+import asyncio
+import logging
+import os
+from typing import AsyncIterable, AsyncIterator, Callable
+
+import metrics
+from faq import normalize
+
+log = logging.getLogger("speculative")
+
+ENABLED = os.getenv("SPECULATIVE_LLM", "0").lower() in ("1", "true", "yes")
+STABLE_SECS = float(os.getenv("SPECULATIVE_STABLE_MS", "200")) / 1000
+MIN_WORDS = 2
+
+
+def _tokens(chunk) -> int:
+    if isinstance(chunk, str):
+        return max(1, len(chunk) // 4)
+    delta = getattr(chunk, "delta", None)
+    content = getattr(delta, "content", None) or ""
+    return len(content) // 4 if content else 0
+
+
+class Speculation:
+    def __init__(self, text: str, stream: AsyncIterable):
+        self.text = text
+        self.key = normalize(text)
+        self.chunks: list = []
+        self.tokens = 0
+        self.done = False
+        self.error: BaseException | None = None
+        self._changed = asyncio.Event()
+        self._task = asyncio.create_task(self._run(stream))
+
+    async def _run(self, stream: AsyncIterable) -> None:
+        try:
+            async for chunk in stream:
+                self.chunks.append(chunk)
+                usage = getattr(chunk, "usage", None)
+                if usage is not None and usage.completion_tokens:
+                    self.tokens = usage.completion_tokens
+                else:
+                    self.tokens += _tokens(chunk)
+                self._changed.set()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._changed.set()
+
+    async def replay(self) -> AsyncIterator:
+        """Yield what was generated so far, then follow the live stream."""
+        i = 0
+        while True:
+            while i < len(self.chunks):
+                yield self.chunks[i]
+                i += 1
+            if self.done:
+                break
+            self._changed.clear()
+            if i == len(self.chunks) and not self.done:
+                await self._changed.wait()
+        if self.error is not None:
+            raise self.error
+
+    def cancel(self) -> None:
+        self._task.cancel()
+
+
+class Speculator:
+    """Per-session speculation state, driven by interim and final transcripts."""
+
+    def __init__(self, start: Callable[[str], AsyncIterable], stable_secs: float = STABLE_SECS):
+        self._start = start
+        self._stable_secs = stable_secs
+        self._pending: asyncio.TimerHandle | None = None
+        self._pending_key = ""
+        self._current: Speculation | None = None
+
+    def on_interim(self, text: str) -> None:
+        key = normalize(text)
+        if len(key.split()) < MIN_WORDS or key == self._pending_key:
+            return
+        self._pending_key = key
+        if self._pending is not None:
+            self._pending.cancel()
+        self._pending = asyncio.get_running_loop().call_later(self._stable_secs, self._launch, text)
+
+    def _launch(self, text: str) -> None:
+        self._pending = None
+        if self._current is not None and self._current.key == normalize(text):
+            return
+        self._discard()
+        self._current = Speculation(text, self._start(text))
+        metrics.registry.inc("speculation_started")
+
+    def _discard(self) -> None:
+        if self._current is not None:
+            self._current.cancel()
+            metrics.registry.inc("speculation_misses")
+            metrics.registry.inc("speculation_wasted_tokens", self._current.tokens)
+            self._current = None
+
+    def take(self, final_text: str) -> Speculation | None:
+        """Claim the speculation if it was started on `final_text`, else discard it."""
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        self._pending_key = ""
+        spec, key = self._current, normalize(final_text)
+        if spec is not None and spec.key == key and spec.error is None:
+            self._current = None
+            metrics.registry.inc("speculation_hits")
+            return spec
+        self._discard()
+        return None
+
+    def reset(self) -> None:
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        self._pending_key = ""
+        self._discard()
+
+
+def _hit_rate(c: dict) -> float:
+    decided = c.get("speculation_hits", 0) + c.get("speculation_misses", 0)
+    return c.get("speculation_hits", 0) / decided if decided else 0.0
+
+
+metrics.registry.derive("speculation_hit_rate", _hit_rate)
@@ -0,0 +1,166 @@
+# startup_profile.py
+"""
+Cold-start profile for the worker: where import time goes, and how long a
+fresh process takes until it could take a call.
+
+Import breakdown: `python -X importtime -c "import sales_agent"` in a clean
+subprocess, reported as the slowest top-level imports and the packages with
+the most self time. Time-to-ready: another fresh process timing each startup
+phase in order - interpreter start, `import sales_agent`, plugin imports, VAD
+load and the per-process context (context store, BM25 index, catalog, FAQ,
+instructions) - the same work prewarm does before a job is accepted.
+
+Every run can be appended to a JSONL file (--output) together with the git
+revision, so cold start can be compared release over release.
+
+Usage:
+  python sales_agent.py profile-startup [--top 15] [--json] [--output startup.jsonl]
+  python startup_profile.py ...
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+# runs in the child process; prints one JSON line of phase timings
+_READY_SCRIPT = """
+import json, os, sys, time
+import psutil
+t0 = psutil.Process().create_time()
+phases = {}
+mark = time.time()
+phases["interpreter"] = mark - t0
+def phase(name, fn):
+    global mark
+    fn()
+    now = time.time()
+    phases[name] = now - mark
+    mark = now
+mod = {}
+phase("import sales_agent", lambda: mod.setdefault("m", __import__("sales_agent")))
+sa = mod["m"]
+phase("plugins", sa.load_plugins)
+phase("vad", sa.load_vad)
+def context():
+    snapshot = sa.context_store.get_store().refresh()
+    sa.retrieval.get_index(snapshot)
+    sa.catalog.get_catalog(snapshot)
+    sa.faq.get_faq(snapshot)
+    sa.get_instructions(snapshot)
+phase("context", context)
+print("@@" + json.dumps({"phases": phases, "total": mark - t0}))
+"""
+
+
+def import_breakdown() -> list[dict]:
+    """Parse -X importtime output into [{name, depth, self, cumulative}] in seconds."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import sales_agent"],
+        cwd=HERE, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import sales_agent failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2  # nested imports are indented two spaces per level
+        rows.append({
+            "name": name.strip(),
+            "depth": depth,
+            "self": int(self_us) / 1e6,
+            "cumulative": int(cumulative_us) / 1e6,
+        })
+    return rows
+
+
+def time_to_ready() -> dict:
+    """Phase timings of a fresh process getting ready to take a call."""
+    proc = subprocess.run(
+        [sys.executable, "-c", _READY_SCRIPT], cwd=HERE, capture_output=True, text=True,
+    )
+    for line in proc.stdout.splitlines():
+        if line.startswith("@@"):
+            return json.loads(line[2:])
+    raise RuntimeError(f"time-to-ready run failed:\n{proc.stderr[-2000:]}")
+
+
+def summarize(rows: list[dict], top: int) -> dict:
+    # importtime lists a module after its imports; keep only the sales_agent subtree,
+    # not what the interpreter imported at startup
+    end = next(i for i, r in enumerate(rows) if r["depth"] == 0 and r["name"] == "sales_agent")
+    start = max((i for i in range(end) if rows[i]["depth"] == 0), default=-1) + 1
+    rows = rows[start:end + 1]
+    direct = sorted((r for r in rows if r["depth"] == 1), key=lambda r: -r["cumulative"])
+    packages: dict[str, float] = {}
+    for r in rows:
+        root = r["name"].split(".")[0]
+        if r["name"].startswith("livekit."):
+            root = ".".join(r["name"].split(".")[:3 if r["name"].startswith("livekit.plugins.") else 2])
+        packages[root] = packages.get(root, 0.0) + r["self"]
+    return {
+        "import_total": rows[-1]["cumulative"],
+        "modules": len(rows),
+        "direct": [{"name": r["name"], "cumulative": r["cumulative"]} for r in direct[:top]],
+        "packages": [{"name": k, "self": v} for k, v in sorted(packages.items(), key=lambda kv: -kv[1])[:top]],
+    }
+
+
+def _git_rev() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def report(result: dict) -> None:
+    imports, ready = result["imports"], result["ready"]
+    print(f"import sales_agent: {imports['import_total'] * 1000:.0f} ms across {imports['modules']} modules\n")
+    print("slowest direct imports (cumulative):")
+    for r in imports["direct"]:
+        print(f"  {r['cumulative'] * 1000:8.1f} ms  {r['name']}")
+    print("\nheaviest packages (self time):")
+    for r in imports["packages"]:
+        print(f"  {r['self'] * 1000:8.1f} ms  {r['name']}")
+    print("\ntime to ready (fresh process):")
+    for name, secs in ready["phases"].items():
+        print(f"  {secs * 1000:8.1f} ms  {name}")
+    print(f"  {ready['total'] * 1000:8.1f} ms  total")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="sales_agent.py profile-startup", description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--top", type=int, default=15, help="rows per table")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    parser.add_argument("--output", help="append the result as one JSON line to this file")
+    args = parser.parse_args(argv)
+
+    result = {
+        "at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "rev": _git_rev(),
+        "python": sys.version.split()[0],
+        "imports": summarize(import_breakdown(), args.top),
+        "ready": time_to_ready(),
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        report(result)
+    if args.output:
+        with open(args.output, "a") as f:
+            f.write(json.dumps(result) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
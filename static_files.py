@@ -0,0 +1,237 @@
+# static_files.py
+"""
+Static assets for the token server: strong ETags, caching headers,
+precompressed variants and zero-copy sends.
+
+Only paths on the STATIC_ALLOW list (files, or directories whose contents are
+all served) are reachable; by default the test interface and the
+livekit-client bundle. Anything else under the server directory, such as
+.env, transcripts or the source, is a 404.
+
+Every file served gets a strong ETag from a SHA-256 of its contents, computed
+off the event loop and cached until the file's size or mtime changes. A
+matching If-None-Match (or, without one, an unchanged If-Modified-Since) gets
+304 Not Modified. HTML is sent with Cache-Control: no-cache, so pages are
+revalidated on each visit. Other assets may be cached for STATIC_MAX_AGE
+seconds.
+
+Compressible files are compressed once, into STATIC_CACHE_DIR: the ones
+listed in STATIC_PRECOMPRESS at startup, and any other on its first request.
+Each is compressed with gzip, and with brotli when the `brotli` package is
+installed. A variant is only kept when it is smaller. Clients get the best
+encoding their Accept-Encoding allows, with a per-encoding ETag and
+Vary: Accept-Encoding. Identity and compressed bodies alike go out with
+loop.sendfile.
+"""
+
+import asyncio
+import base64
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+log = logging.getLogger("static_files")
+
+CACHE_DIR = Path(os.getenv("STATIC_CACHE_DIR", ".static_cache"))
+MAX_AGE = int(os.getenv("STATIC_MAX_AGE", "3600"))
+# relative to the served directory; a directory allows everything below it
+ALLOW = [
+    p for p in os.getenv("STATIC_ALLOW", "test_interface.html,node_modules/livekit-client/dist").split(",") if p
+]
+PRECOMPRESS = [
+    p for p in os.getenv(
+        "STATIC_PRECOMPRESS", "test_interface.html,node_modules/livekit-client/dist/livekit-client.umd.js"
+    ).split(",") if p
+]
+# smaller files are not worth a compressed variant
+MIN_COMPRESS_BYTES = 1024
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/wasm")
+
+mimetypes.add_type("application/javascript", ".js")
+mimetypes.add_type("application/javascript", ".mjs")
+
+# preference order when the client accepts several
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+@dataclass
+class Asset:
+    path: Path
+    size: int
+    mtime_ns: int
+    digest: str  # urlsafe base64 of the SHA-256, unpadded
+    content_type: str
+    variants: dict[str, tuple[Path, int]] = field(default_factory=dict)  # encoding -> (file, size)
+
+    def etag(self, encoding: str | None = None) -> str:
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    @property
+    def last_modified(self) -> str:
+        return formatdate(self.mtime_ns / 1e9, usegmt=True)
+
+    @property
+    def cache_control(self) -> str:
+        return "no-cache" if self.content_type == "text/html" else f"public, max-age={MAX_AGE}"
+
+    @property
+    def compressible(self) -> bool:
+        return self.size >= MIN_COMPRESS_BYTES and self.content_type.startswith(COMPRESSIBLE)
+
+
+def _digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return base64.urlsafe_b64encode(h.digest()[:18]).decode()
+
+
+def _compress(asset: Asset, cache_dir: Path) -> dict[str, tuple[Path, int]]:
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    data = asset.path.read_bytes()
+    variants = {}
+    for encoding in ENCODINGS:
+        target = cache_dir / f"{asset.digest}.{encoding}"
+        if not target.exists():
+            if encoding == "br":
+                body = brotli.compress(data, quality=11)
+            else:
+                body = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(body) >= asset.size:
+                continue
+            tmp = target.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(body)
+            os.replace(tmp, target)
+        variants[encoding] = (target, target.stat().st_size)
+    return variants
+
+
+def accepted_encodings(header: str) -> set[str]:
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored."""
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+class StaticFiles:
+    def __init__(self, directory: Path, cache_dir: Path = CACHE_DIR, allow: list[str] = ALLOW):
+        self.directory = directory.resolve()
+        self.allow = [(self.directory / p.strip().strip("/")).resolve() for p in allow]
+        self.cache_dir = cache_dir
+        self._assets: dict[Path, Asset] = {}
+        self._pending: dict[Path, asyncio.Future] = {}
+        self._compressed: set[str] = set()  # digests already compressed, or being compressed
+        self._lock = threading.Lock()
+
+    def resolve(self, url_path: str) -> Path | None:
+        """Allowed file for a URL path; None if missing, hidden (.env, .git) or not on the allow list."""
+        relative = url_path.lstrip("/")
+        if any(part.startswith(".") for part in Path(relative).parts):
+            return None
+        target = (self.directory / relative).resolve()
+        if target.is_dir():
+            target = target / "index.html"
+        if not any(target.is_relative_to(allowed) for allowed in self.allow):
+            return None
+        return target if target.is_file() else None
+
+    def _load(self, path: Path, st: os.stat_result, compress: bool) -> Asset:
+        asset = Asset(
+            path=path,
+            size=st.st_size,
+            mtime_ns=st.st_mtime_ns,
+            digest=_digest(path),
+            content_type=mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+        )
+        if compress and asset.compressible:
+            self._compressed.add(asset.digest)
+            asset.variants = _compress(asset, self.cache_dir)
+        with self._lock:
+            self._assets[path] = asset
+        return asset
+
+    async def precompress(self, paths: list[str] = PRECOMPRESS) -> None:
+        """Hash and compress the listed assets before the first visitor asks for them."""
+        for url_path in paths:
+            path = self.resolve(url_path)
+            if path is None:
+                log.warning("Not precompressing %s: no such file", url_path)
+                continue
+            asset = await asyncio.to_thread(self._load, path, path.stat(), True)
+            sizes = ", ".join(f"{enc} {size / 1024:.0f} KiB" for enc, (_, size) in asset.variants.items())
+            log.info("📦 %s: %.0f KiB%s", url_path, asset.size / 1024, f" ({sizes})" if sizes else "")
+
+    async def get(self, path: Path) -> Asset:
+        """Current asset for a file; rehashed when its size or mtime changes."""
+        st = path.stat()
+        asset = self._assets.get(path)
+        if asset is None or asset.size != st.st_size or asset.mtime_ns != st.st_mtime_ns:
+            pending = self._pending.get(path)
+            if pending is None:
+                pending = self._pending[path] = asyncio.ensure_future(asyncio.to_thread(self._load, path, st, False))
+                pending.add_done_callback(lambda _: self._pending.pop(path, None))
+            asset = await asyncio.shield(pending)
+        if asset.compressible and asset.digest not in self._compressed:
+            self._compress_later(asset)
+        return asset
+
+    def _compress_later(self, asset: Asset) -> None:
+        # served uncompressed until the variants exist
+        self._compressed.add(asset.digest)
+
+        def run() -> None:
+            try:
+                variants = _compress(asset, self.cache_dir)
+                with self._lock:
+                    current = self._assets.get(asset.path)
+                    if current is not None and current.digest == asset.digest:
+                        current.variants = variants
+            except OSError as e:
+                log.warning("Could not compress %s: %s", asset.path, e)
+
+        asyncio.ensure_future(asyncio.to_thread(run))
+
+    @staticmethod
+    def choose(asset: Asset, accept_encoding: str) -> str | None:
+        if not asset.variants or not accept_encoding:
+            return None
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ENCODINGS:
+            if encoding in asset.variants and encoding in accepted:
+                return encoding
+        return None
+
+    @staticmethod
+    def not_modified(asset: Asset, etag: str, headers: dict[str, str]) -> bool:
+        if "if-none-match" in headers:
+            return etag_matches(headers["if-none-match"], etag)
+        since = headers.get("if-modified-since")
+        if since:
+            try:
+                return int(asset.mtime_ns / 1e9) <= parsedate_to_datetime(since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
@@ -0,0 +1,171 @@
+# test_barge_in.py
+"""
+Drive the barge-in path with synthetic audio.
+
+A fake reply is in flight: an LLM stream producing tokens and a TTS task
+pushing 20 ms frames into an outbound buffer. Synthetic caller audio (room
+noise, then a voiced burst) goes through the energy VAD in real time; its
+start-of-speech event triggers the barge-in controller. Runs as a script or
+under pytest.
+"""
+
+import asyncio
+import time
+
+import numpy as np
+
+import barge_in
+import energy_vad
+import metrics
+
+RATE = 16000
+FRAME = RATE // 50  # 20 ms
+
+
+def caller_audio(noise_secs: float = 0.6, speech_secs: float = 1.0, seed: int = 3) -> list:
+    """Room noise followed by a harmonic, syllable-modulated 'voice'."""
+    from livekit import rtc
+
+    rng = np.random.default_rng(seed)
+    noise = rng.standard_normal(int(noise_secs * RATE)) * 150
+    t = np.arange(int(speech_secs * RATE)) / RATE
+    phase = 2 * np.pi * np.cumsum(150 + 20 * np.sin(2 * np.pi * t)) / RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6)) * 6000 * (0.6 + 0.4 * np.abs(np.sin(4 * np.pi * t)))
+    voice += rng.standard_normal(len(t)) * 150
+    pcm = np.concatenate((noise, voice)).astype(np.int16)
+    return [rtc.AudioFrame(pcm[i:i + FRAME].tobytes(), RATE, 1, FRAME) for i in range(0, len(pcm) - FRAME + 1, FRAME)]
+
+
+class FakeOutput:
+    """Outbound audio buffer standing in for session.output.audio."""
+
+    def __init__(self):
+        self.frames: list[bytes] = []
+        self.cleared = 0
+
+    def clear_buffer(self) -> None:
+        self.frames.clear()
+        self.cleared += 1
+
+
+async def fake_llm(state: dict):
+    try:
+        for i in range(1000):
+            await asyncio.sleep(0.03)  # a slow, long answer
+            yield f"word{i} "
+    finally:
+        state["llm_closed"] = True
+
+
+async def fake_tts(controller: barge_in.BargeInController, output: FakeOutput, state: dict):
+    async for _ in controller.guard(fake_llm(state)):
+        state["tokens"] = state.get("tokens", 0) + 1
+        # each token becomes a couple of frames of synthesized audio
+        for _ in range(2):
+            await asyncio.sleep(0.005)
+            output.frames.append(b"\0" * FRAME * 2)
+
+
+async def drive(frames: list, controller: barge_in.BargeInController) -> tuple[float | None, float | None]:
+    """Push frames in real time; return (start-of-speech audio time, barge-in latency)."""
+    from livekit.agents import vad
+
+    stream = energy_vad.EnergyVAD.load().stream()
+    detected, latency = None, None
+
+    async def events():
+        nonlocal detected, latency
+        async for ev in stream:
+            if ev.type == vad.VADEventType.START_OF_SPEECH and detected is None:
+                detected = ev.timestamp
+                task = controller.on_speech_start()
+                if task is not None:
+                    latency = await task
+
+    consumer = asyncio.create_task(events())
+    for frame in frames:
+        stream.push_frame(frame)
+        await asyncio.sleep(0.02)
+    stream.end_input()
+    await consumer
+    await stream.aclose()
+    return detected, latency
+
+
+def test_barge_in_cancels_reply():
+    async def main():
+        output, state = FakeOutput(), {}
+        controller = barge_in.BargeInController(clear_audio=output.clear_buffer)
+        reply = asyncio.create_task(fake_tts(controller, output, state))
+        controller.track_task(reply)
+        before = metrics.registry.counters.get("interruptions", 0)
+
+        detected, latency = await drive(caller_audio(), controller)
+
+        assert detected is not None and 0.6 <= detected < 0.8, f"speech detected at {detected}"
+        assert latency is not None and latency < 0.1, f"barge-in took {latency}"
+        assert reply.done(), "TTS task still running"
+        assert state.get("llm_closed"), "LLM stream was not closed"
+        assert output.cleared == 1 and not output.frames, "tail audio left in the outbound buffer"
+        assert metrics.registry.counters["interruptions"] == before + 1
+        assert metrics.registry.histogram("barge_in").count >= 1
+        print(f"✅ barge-in {latency * 1000:.1f} ms after speech start at {detected:.2f}s, "
+              f"{state.get('tokens', 0)} tokens generated before")
+
+    asyncio.run(main())
+
+
+def test_no_barge_in_when_idle():
+    async def main():
+        output = FakeOutput()
+        controller = barge_in.BargeInController(clear_audio=output.clear_buffer)
+        detected, latency = await drive(caller_audio(speech_secs=0.4), controller)
+        assert detected is not None and latency is None
+        assert output.cleared == 0
+        print("✅ speech while idle does not interrupt anything")
+
+    asyncio.run(main())
+
+
+def test_barge_in_while_audio_still_playing():
+    async def main():
+        output = FakeOutput()
+        output.frames.append(b"\0" * FRAME * 2)
+        interrupted = []
+        controller = barge_in.BargeInController(
+            interrupt=lambda: interrupted.append(time.perf_counter()),
+            clear_audio=output.clear_buffer,
+            is_speaking=lambda: True,  # generation done, playout still going
+        )
+        latency = await controller.on_speech_start()
+        assert interrupted and output.cleared == 1 and latency < 0.01
+        print("✅ playout-only barge-in clears audio and interrupts the session")
+
+    asyncio.run(main())
+
+
+def test_guard_propagates_errors():
+    async def failing():
+        yield "a"
+        raise ValueError("stream broke")
+
+    async def main():
+        controller = barge_in.BargeInController()
+        got = []
+        try:
+            async for item in controller.guard(failing()):
+                got.append(item)
+        except ValueError:
+            assert got == ["a"]
+            print("✅ stream errors reach the consumer")
+            return
+        raise AssertionError("expected ValueError")
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    test_barge_in_cancels_reply()
+    test_no_barge_in_when_idle()
+    test_barge_in_while_audio_still_playing()
+    test_guard_propagates_errors()
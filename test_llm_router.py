@@ -0,0 +1,204 @@
+# test_llm_router.py
+"""
+Exercise llm_router against local OpenAI-compatible stand-in servers.
+
+Three servers stream /v1/chat/completions as SSE: a fast one, a slow one
+(long time to first token) and one that always returns 500. Runs as a script
+or under pytest.
+"""
+
+import asyncio
+import json
+import os
+import time
+
+from aiohttp import web
+
+import llm_router
+import metrics
+
+
+def _chunk(content: str | None, finish: str | None = None) -> str:
+    body = {
+        "id": "chatcmpl-test",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": "stand-in",
+        "choices": [{"index": 0, "delta": {"role": "assistant", "content": content}, "finish_reason": finish}],
+    }
+    return f"data: {json.dumps(body)}\n\n"
+
+
+def stand_in(reply: str, first_token_delay: float = 0.0, fail: bool = False):
+    calls = {"n": 0, "cancelled": 0}
+
+    async def completions(request: web.Request) -> web.StreamResponse:
+        calls["n"] += 1
+        await request.json()
+        if fail:
+            return web.json_response({"error": {"message": "backend down"}}, status=500)
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        try:
+            await asyncio.sleep(first_token_delay)
+            for word in reply.split(" "):
+                await resp.write(_chunk(word + " ").encode())
+                await asyncio.sleep(0.01)
+            await resp.write(_chunk(None, "stop").encode())
+            await resp.write(b"data: [DONE]\n\n")
+        except (asyncio.CancelledError, ConnectionResetError):
+            calls["cancelled"] += 1  # the router hung up on the losing hedge
+        return resp
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    return app, calls
+
+
+async def _serve(app: web.Application) -> tuple[web.AppRunner, str]:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/v1"
+
+
+def _backend(name: str, base_url: str, **breaker) -> llm_router.Backend:
+    import openai as openai_sdk
+    from livekit.plugins import openai
+
+    client = openai_sdk.AsyncClient(api_key="test", base_url=base_url, max_retries=0)
+    return llm_router.Backend(
+        name, openai.LLM(model="stand-in", client=client), llm_router.CircuitBreaker(**breaker)
+    )
+
+
+async def _ask(router: llm_router.HedgedRouter) -> str:
+    from livekit.agents import llm
+    from livekit.agents.voice import ModelSettings
+
+    chat_ctx = llm.ChatContext()
+    chat_ctx.add_message(role="user", content="hello")
+    text = ""
+    async for chunk in router.chat(chat_ctx, [], ModelSettings()):
+        if chunk.delta and chunk.delta.content:
+            text += chunk.delta.content
+    return text.strip()
+
+
+async def _run(servers: dict, scenario):
+    runners, urls, calls = [], {}, {}
+    try:
+        for name, (app, c) in servers.items():
+            runner, urls[name] = await _serve(app)
+            runners.append(runner)
+            calls[name] = c
+        return await scenario(urls, calls)
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+
+def test_hedge_beats_slow_primary():
+    async def scenario(urls, calls):
+        router = llm_router.HedgedRouter(
+            [_backend("slow", urls["slow"]), _backend("fast", urls["fast"])], hedge_delay=0.1
+        )
+        hedges = metrics.registry.counters.get("llm_hedges", 0)
+        start = time.perf_counter()
+        text = await _ask(router)
+        elapsed = time.perf_counter() - start
+        assert text == "fast reply here", text
+        assert elapsed < 1.0, f"hedged reply took {elapsed:.2f}s"
+        assert metrics.registry.counters.get("llm_hedges", 0) == hedges + 1
+        assert calls["slow"]["n"] == 1 and calls["fast"]["n"] == 1
+        print(f"✅ hedged reply in {elapsed * 1000:.0f} ms: {text!r}")
+
+    asyncio.run(_run(
+        {"slow": stand_in("slow reply", first_token_delay=2.0), "fast": stand_in("fast reply here")},
+        scenario,
+    ))
+
+
+def test_no_hedge_when_primary_is_fast():
+    async def scenario(urls, calls):
+        router = llm_router.HedgedRouter(
+            [_backend("fast", urls["fast"]), _backend("spare", urls["spare"])], hedge_delay=0.5
+        )
+        assert await _ask(router) == "primary answer"
+        assert calls["spare"]["n"] == 0, "spare backend should not have been asked"
+        print("✅ fast primary answered without a hedge")
+
+    asyncio.run(_run({"fast": stand_in("primary answer"), "spare": stand_in("spare answer")}, scenario))
+
+
+def test_failover_and_breaker():
+    async def scenario(urls, calls):
+        down = _backend("down", urls["down"], failures=2, cooldown=0.3)
+        router = llm_router.HedgedRouter([down, _backend("ok", urls["ok"])], hedge_delay=1.0)
+
+        for _ in range(2):
+            assert await _ask(router) == "still here"
+        assert down.breaker.state == "open"
+        assert calls["down"]["n"] == 2
+
+        # open breaker: the failing backend is skipped entirely
+        assert await _ask(router) == "still here"
+        assert calls["down"]["n"] == 2
+
+        # after the cooldown a single trial goes through and fails again
+        await asyncio.sleep(0.35)
+        assert down.breaker.state == "half_open"
+        assert await _ask(router) == "still here"
+        assert calls["down"]["n"] == 3
+        assert down.breaker.state == "open"
+        print("✅ failover served every turn; breaker opened, probed and re-opened")
+
+    asyncio.run(_run({"down": stand_in("", fail=True), "ok": stand_in("still here")}, scenario))
+
+
+def test_lost_trial_releases_breaker():
+    async def scenario(urls, calls):
+        slow = _backend("slow", urls["slow"], failures=1, cooldown=0.1)
+        router = llm_router.HedgedRouter([slow, _backend("fast", urls["fast"])], hedge_delay=0.1)
+
+        slow.breaker.record_failure()
+        await asyncio.sleep(0.15)
+        assert slow.breaker.state == "half_open" and slow.breaker.allow()
+
+        # the trial request is hedged, loses to the fast backend and is cancelled
+        assert await _ask(router) == "fast reply"
+        assert calls["slow"]["n"] == 1
+        assert slow.breaker.state == "half_open"
+        assert slow.breaker.allow(), "a cancelled trial must not keep the breaker closed to probes"
+        print("✅ a trial that lost the hedge race let the next request probe")
+
+    asyncio.run(_run(
+        {"slow": stand_in("slow reply", first_token_delay=2.0), "fast": stand_in("fast reply")},
+        scenario,
+    ))
+
+
+def test_all_backends_down_raises():
+    async def scenario(urls, calls):
+        router = llm_router.HedgedRouter(
+            [_backend("a", urls["a"]), _backend("b", urls["b"])], hedge_delay=0.1
+        )
+        try:
+            await _ask(router)
+        except Exception as e:
+            print(f"✅ all backends down raised {type(e).__name__}")
+            return
+        raise AssertionError("expected an error when every backend fails")
+
+    asyncio.run(_run({"a": stand_in("", fail=True), "b": stand_in("", fail=True)}, scenario))
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("OPENAI_API_KEY", "test")
+    test_hedge_beats_slow_primary()
+    test_no_hedge_when_primary_is_fast()
+    test_failover_and_breaker()
+    test_lost_trial_releases_breaker()
+    test_all_backends_down_raises()
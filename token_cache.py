@@ -0,0 +1,164 @@
+# token_cache.py
+"""
+Cached, pre-minted LiveKit access tokens for the token endpoint.
+
+Credentials are read from the environment once. TokenCache keeps one signed
+JWT per (identity, name, room, grants, room configuration) and hands it out
+until less than TOKEN_REFRESH_BEFORE of its TOKEN_TTL is left; only a miss
+signs on the request path. A background refresher re-mints the tokens of hot rooms (any
+requested within TOKEN_HOT_WINDOW) before they reach that point, so a traffic
+spike on a room that is already in use is served entirely from the cache.
+Idle entries are dropped, and the cache never holds more than TOKEN_CACHE_MAX.
+
+Counters in metrics: token_cache_hits, token_cache_misses, tokens_minted,
+tokens_refreshed.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import NamedTuple
+
+from livekit import api
+
+import metrics
+
+log = logging.getLogger("token_cache")
+
+TOKEN_TTL = float(os.getenv("TOKEN_TTL_SECS", "3600"))
+TOKEN_REFRESH_BEFORE = float(os.getenv("TOKEN_REFRESH_BEFORE_SECS", "600"))
+HOT_WINDOW = float(os.getenv("TOKEN_HOT_WINDOW_SECS", "300"))
+REFRESH_INTERVAL = float(os.getenv("TOKEN_REFRESH_INTERVAL_SECS", "30"))
+MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX", "10000"))
+
+
+@dataclass(frozen=True)
+class Credentials:
+    api_key: str
+    api_secret: str
+    url: str
+
+    @classmethod
+    def from_env(cls) -> "Credentials | None":
+        api_key = os.getenv("LIVEKIT_API_KEY")
+        api_secret = os.getenv("LIVEKIT_API_SECRET")
+        url = os.getenv("LIVEKIT_URL")
+        if not api_key or not api_secret or not url:
+            return None
+        return cls(api_key, api_secret, url)
+
+
+class TokenKey(NamedTuple):
+    identity: str
+    name: str
+    room: str
+    grants: str  # repr of the VideoGrants, which is stable for equal grants
+    config: bytes  # serialized RoomConfiguration (agent dispatch), b"" for none
+
+
+class _Entry:
+    __slots__ = ("token", "expires_at", "refresh_at", "last_used", "grants", "room_config")
+
+    def __init__(self, token: str, expires_at: float, grants: api.VideoGrants, room_config):
+        self.token = token
+        self.expires_at = expires_at
+        self.refresh_at = expires_at - TOKEN_REFRESH_BEFORE
+        self.last_used = time.monotonic()
+        self.grants = grants
+        self.room_config = room_config
+
+
+class TokenCache:
+    def __init__(self, credentials: Credentials, ttl: float = TOKEN_TTL, max_entries: int = MAX_ENTRIES):
+        if ttl <= TOKEN_REFRESH_BEFORE:
+            raise ValueError("TOKEN_TTL_SECS must be longer than TOKEN_REFRESH_BEFORE_SECS")
+        self.credentials = credentials
+        self._ttl = ttl
+        self._max = max_entries
+        self._entries: OrderedDict[TokenKey, _Entry] = OrderedDict()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _mint(self, key: TokenKey, grants: api.VideoGrants, room_config=None) -> _Entry:
+        # exp is whole seconds from the wall clock; track expiry on the monotonic clock
+        token = (
+            api.AccessToken(self.credentials.api_key, self.credentials.api_secret)
+            .with_identity(key.identity)
+            .with_name(key.name)
+            .with_grants(grants)
+            .with_ttl(timedelta(seconds=self._ttl))
+        )
+        if room_config is not None:
+            token = token.with_room_config(room_config)
+        metrics.registry.inc("tokens_minted")
+        return _Entry(token.to_jwt(), time.monotonic() + self._ttl - 1, grants, room_config)
+
+    def get(self, identity: str, room: str, grants: api.VideoGrants, name: str = "",
+            room_config: api.RoomConfiguration | None = None) -> tuple[str, float]:
+        """A valid JWT and its remaining lifetime in seconds; signs only on a miss."""
+        config = room_config.SerializeToString(deterministic=True) if room_config is not None else b""
+        key = TokenKey(identity, name or identity, room, repr(grants), config)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and now < entry.refresh_at:
+            metrics.registry.inc("token_cache_hits")
+            entry.last_used = now
+            self._entries.move_to_end(key)
+        else:
+            metrics.registry.inc("token_cache_misses")
+            entry = self._entries[key] = self._mint(key, grants, room_config)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max:
+                self._entries.popitem(last=False)
+        return entry.token, entry.expires_at - now
+
+    # --- background refresh ---
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(REFRESH_INTERVAL)
+            try:
+                await self.refresh()
+            except Exception:
+                log.exception("token refresh failed")
+
+    async def refresh(self) -> int:
+        """Re-mint hot tokens due within the next two intervals and drop idle ones; returns the number re-minted."""
+        now = time.monotonic()
+        horizon = now + 2 * REFRESH_INTERVAL
+        due, idle = [], []
+        for key, entry in self._entries.items():
+            if now - entry.last_used > HOT_WINDOW:
+                if now >= entry.refresh_at:
+                    idle.append(key)
+            elif entry.refresh_at <= horizon:
+                due.append(key)
+        for key in idle:
+            del self._entries[key]
+        for key in due:
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            fresh = self._mint(key, entry.grants, entry.room_config)
+            fresh.last_used = entry.last_used
+            self._entries[key] = fresh
+            metrics.registry.inc("tokens_refreshed")
+            await asyncio.sleep(0)  # one signature at a time, between requests
+        if due or idle:
+            log.debug("Re-minted %d token(s), dropped %d idle", len(due), len(idle))
+        return len(due)
@@ -0,0 +1,209 @@
+# tts_cache.py
+"""
+Content-addressed cache of synthesized speech.
+
+Sales calls repeat the same sentences (greetings, "I don't have that
+information.", prices), so synthesized PCM is kept under a key of
+normalized text + sample rate + the synthesis settings (model, voice,
+language, speed, emotion, volume). Lookups hit an in-memory LRU first,
+then an on-disk tier that is trimmed oldest-first once it grows past its
+size budget.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+from livekit import rtc
+
+log = logging.getLogger("tts_cache")
+
+CACHE_DIR = Path(os.getenv("TTS_CACHE_DIR", ".tts_cache"))
+MEMORY_BYTES = int(os.getenv("TTS_CACHE_MEMORY_MB", "32")) * 1024 * 1024
+DISK_BYTES = int(os.getenv("TTS_CACHE_DISK_MB", "512")) * 1024 * 1024
+# longer sentences are rarely repeated word for word
+MAX_TEXT_CHARS = int(os.getenv("TTS_CACHE_MAX_CHARS", "200"))
+FRAME_MS = 20
+
+_HEADER = struct.Struct("<IH")  # sample_rate, num_channels
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    return _SPACE_RE.sub(" ", text).strip().casefold()
+
+
+def tts_params(tts) -> dict:
+    """Settings of a TTS plugin that change the audio it produces, for the cache key."""
+    opts = getattr(tts, "_opts", None)
+    params = {"model": getattr(tts, "model", "")}
+    for name in ("voice", "language", "speed", "emotion", "volume"):
+        params[name] = getattr(opts, name, None)
+    return params
+
+
+class CachedAudio(NamedTuple):
+    sample_rate: int
+    num_channels: int
+    pcm: bytes
+
+    def frames(self) -> Iterator[rtc.AudioFrame]:
+        samples = self.sample_rate * FRAME_MS // 1000
+        step = samples * self.num_channels * 2
+        view = memoryview(self.pcm)
+        for i in range(0, len(view), step):
+            chunk = view[i:i + step]
+            yield rtc.AudioFrame(
+                data=chunk,
+                sample_rate=self.sample_rate,
+                num_channels=self.num_channels,
+                samples_per_channel=len(chunk) // (2 * self.num_channels),
+            )
+
+
+class AudioCache:
+    def __init__(self, directory: Path = CACHE_DIR, memory_bytes: int = MEMORY_BYTES, disk_bytes: int = DISK_BYTES):
+        self._dir = Path(directory)
+        self._memory_limit = memory_bytes
+        self._disk_limit = disk_bytes
+        self._memory: OrderedDict[str, CachedAudio] = OrderedDict()
+        self._memory_size = 0
+        self._disk_size: int | None = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str, sample_rate: int, params: dict) -> str:
+        settings = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(f"{settings}|{sample_rate}|{normalize(text)}".encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self._dir / key[:2] / f"{key}.pcm"
+
+    # --- memory tier ---
+    def _remember(self, key: str, audio: CachedAudio) -> None:
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_size -= len(old.pcm)
+            self._memory[key] = audio
+            self._memory_size += len(audio.pcm)
+            while self._memory_size > self._memory_limit and self._memory:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted.pcm)
+
+    def get_memory(self, key: str) -> CachedAudio | None:
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+            return audio
+
+    # --- disk tier ---
+    def _read_disk(self, key: str) -> CachedAudio | None:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # mtime doubles as the LRU timestamp
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            log.warning("TTS cache read failed for %s: %s", key[:12], e)
+            return None
+        try:
+            sample_rate, num_channels = _HEADER.unpack_from(data)
+        except struct.error:
+            sample_rate = num_channels = 0
+        pcm = data[_HEADER.size:]
+        if not sample_rate or not num_channels or not pcm or len(pcm) % (2 * num_channels):
+            # truncated or corrupt: a miss, and the sentence is synthesized again
+            log.warning("Discarding invalid TTS cache entry %s", key[:12])
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            return None
+        return CachedAudio(sample_rate, num_channels, pcm)
+
+    def _write_disk(self, key: str, audio: CachedAudio) -> None:
+        path = self._path(key)
+        # one temp file per writer: processes and executor threads may cache the same sentence at once
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_bytes(_HEADER.pack(audio.sample_rate, audio.num_channels) + audio.pcm)
+            os.replace(tmp, path)
+        except OSError as e:
+            log.warning("TTS cache write failed for %s: %s", key[:12], e)
+            tmp.unlink(missing_ok=True)
+            return
+        with self._lock:
+            if self._disk_size is None:
+                self._disk_size = sum(p.stat().st_size for p in self._dir.glob("*/*.pcm"))
+            else:
+                self._disk_size += _HEADER.size + len(audio.pcm)
+            over = self._disk_size > self._disk_limit
+        if over:
+            self._trim_disk()
+
+    def _trim_disk(self) -> None:
+        files = []
+        for p in self._dir.glob("*/*.pcm"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        # trim to 90% so we do not rescan on every write
+        target = self._disk_limit * 9 // 10
+        for _, size, p in files:
+            if total <= target:
+                break
+            try:
+                p.unlink()
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_size = total
+        log.info("TTS cache trimmed to %.1f MB", total / 1024 / 1024)
+
+    # --- public API ---
+    async def get(self, key: str) -> CachedAudio | None:
+        audio = self.get_memory(key)
+        if audio is None:
+            audio = await asyncio.to_thread(self._read_disk, key)
+            if audio is not None:
+                self._remember(key, audio)
+        if audio is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return audio
+
+    def put(self, key: str, audio: CachedAudio) -> None:
+        """Store in memory now and write to disk in the background."""
+        self._remember(key, audio)
+        asyncio.get_running_loop().run_in_executor(None, self._write_disk, key, audio)
+
+
+_cache: AudioCache | None = None
+
+
+def get_cache() -> AudioCache:
+    """Process-wide audio cache."""
+    global _cache
+    if _cache is None:
+        _cache = AudioCache()
+    return _cache